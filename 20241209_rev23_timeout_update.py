@@ -2,186 +2,389 @@ import time
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import board
-import busio
-import digitalio
-import adafruit_max31856 
 from datetime import datetime
 import logging
-import pytz
+import os
+import threading
 from matplotlib.dates import DateFormatter
 import matplotlib.dates as mdates
+from kiln_csv import IncrementalCSVWriter
+from kiln_store import SampleStore
+from kiln_smoothing import StreamingMean, MultiHorizonRates, KalmanRate
+from kiln_plot import LivePlotter
+from kiln_pipeline import SampleQueue, AcquisitionThread, ConsumerThread, PeriodicThread, Decimator
+from kiln_scheduler import SampleScheduler
+from kiln_sensors import MAX31856Backend, ReplayBackend, SyntheticBackend
+from kiln_channels import ChannelRegistry
+from kiln_binlog import BinaryLogWriter
+from kiln_segments import write_firing
+from kiln_sqlite import SQLiteSampleStore
+from kiln_journal import SampleJournal, recover_journals
+from kiln_rollups import RollupSet
+from kiln_sessions import FiringSession, prune_sessions
+from kiln_archive import ArchiveWriter
+from kiln_outliers import HampelFilter
+from kiln_phases import PhaseSegmenter, save_phases
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
-# Set up SPI and MAX31856 sensors
-spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-cs1 = digitalio.DigitalInOut(board.D5)  # Chip select for sensor 1
-cs1.direction = digitalio.Direction.OUTPUT
-cs2 = digitalio.DigitalInOut(board.D16)  # Chip select for sensor 2
-cs2.direction = digitalio.Direction.OUTPUT
-
-sensor1 = adafruit_max31856.MAX31856(spi, cs1)
-sensor2 = adafruit_max31856.MAX31856(spi, cs2)
+# Thermocouple channels: one entry per MAX31856, add more to log more probes
+channel_configs = [
+    {"name": "T1", "label": "Sensor 1", "cs_pin": "D5"},
+    {"name": "T2", "label": "Sensor 2", "cs_pin": "D16"},
+]
+rate_horizons = (60, 600, 3600)  # Extra rate columns and plot lines over these trailing seconds (1 min, 10 min, 1 h)
+kalman_filter = False    # Also log a Kalman-filtered temperature and rate per channel, and plot that rate
 
 # Parameters
 interval = 10           # Time interval in seconds
 update_interval = 60    # Time interval to update CSV in seconds
 smoothing_window = 20   # Updated smoothing window size for moving average
+rate_window = 60        # Seconds of readings fitted (least squares) for each rate; 0 uses the last two readings
+kalman_measurement_noise = 0.25  # Std of one reading in °F, for the Kalman filter
+kalman_process_noise = 1e4  # How quickly the Kalman rate may change ((°F/h)^2 per hour); higher follows ramps sooner
 max_timeout_intervals = 3  # Timeout after 3 intervals (30 seconds)
+outlier_window = 15     # Readings per channel in the rolling median used to spot glitches
+outlier_threshold = 3.0  # A reading further than this many (MAD-estimated) standard deviations from the median is bad
+outlier_min_deviation = 100  # ...and it must also be at least this many °F from the median
+outlier_action = 'flag'  # 'flag' logs a bad reading as empty (NaN), 'repair' logs the median instead
+display_interval = 1   # Time between plot refreshes in seconds
+queue_size = 100        # Samples buffered between acquisition and the consumers
+overrun_policy = 'skip'  # On a late tick: 'skip' missed samples or 'catch_up' on them
+high_rate_mode = False  # Sample at the chips' own conversion rate, log the average of each interval
+conversion_period = 0.1  # Seconds between automatic conversions in high-rate mode
+raw_buffer_rows = 36000  # Raw samples kept in memory in high-rate mode (1 hour at 10 Hz)
+sensor_backend = 'max31856'  # 'max31856', or 'replay' / 'synthetic' to run without the Pi
+replay_file = 'thermocouple_data_20241104_112018.csv'  # Recording played back by the 'replay' backend
+replay_speed = 60       # 'replay' and 'synthetic' run this many times faster than real time
+binary_log = True       # Also write a compact fixed-record .klog next to the CSV
+parquet_firing = True   # At the end, also save the firing as a columnar .parquet file (needs pyarrow)
+storage_engine = 'csv'  # 'csv' appends to the CSV (or the session) every update_interval; 'sqlite' inserts into
+                        # database_file instead and writes the CSV once at the end
+database_file = 'kiln_data.db'  # SQLite database shared by all firings (WAL mode, readable while logging)
+journal = True          # Journal every sample so a power cut loses at most journal_fsync_interval
+journal_fsync_interval = 30  # Seconds between fsyncs of the journal (group commit)
+rollup_tiers = (60, 600)  # Bucket sizes in seconds of the min/max/mean/first/last rollups (1 min, 10 min)
+plot_view = 'recent'     # 'recent' plots the last 500 samples; 'firing' plots the whole firing from the rollups
+timezone = 'America/New_York'  # Samples are kept in UTC; CSV times and plot axes are shown in this zone
+firing_sessions = True  # Log into session_root/<start time>/ as hourly segments with a manifest; the flat CSV
+                        # is then exported from the session once at the end
+session_root = 'firings'
+segment_seconds = 3600  # Start a new session segment after this much data
+phase_detection = True  # Split the firing into ramp / hold / cool segments as it runs, saved next to the CSV
+phase_hold_rate = 30    # Rates within ±this many °F/h count as a hold
+phase_threshold = 20    # °F a reading must stray from the current segment's trend before a new segment starts
+archive_file = 'kiln_archive.kga'  # Every firing is appended here, compressed (None to turn off)
+
+# The rate columns already hold the rate over rate_window, so that horizon gets no columns of its own
+channels = ChannelRegistry(channel_configs, rate_horizons=[h for h in rate_horizons if h != rate_window],
+                           kalman=kalman_filter)
+
+# Set up the sensors; the MAX31856 backend is the only one that needs the Pi hardware
+if sensor_backend == 'replay':
+    backend = ReplayBackend(replay_file, channels.temperature_columns)
+elif sensor_backend == 'synthetic':
+    backend = SyntheticBackend(len(channels), speed=replay_speed)
+else:
+    backend = MAX31856Backend(channels.cs_pins, mode='continuous' if high_rate_mode else 'one_shot')
+time_scale = 1 if sensor_backend == 'max31856' else replay_speed
 
 # Create a filename based on the current date and time
 current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
 filename = f"thermocouple_data_{current_time}.csv"
-
-# Initialize DataFrame
-columns = ['Time', 'Temperature Sensor 1 (°F)', 'Rate of Change Sensor 1 (°F/h)',
-           'Temperature Sensor 2 (°F)', 'Rate of Change Sensor 2 (°F/h)',
-           'Average Temperature (°F)', 'Moving Average Rate of Change Sensor 1 (°F/h)', 
-           'Moving Average Rate of Change Sensor 2 (°F/h)', 'Average Rate of Change (°F/h)']  
-data_df = pd.DataFrame(columns=columns)
+raw_filename = f"thermocouple_raw_{current_time}.csv"
+binary_filename = f"thermocouple_data_{current_time}.klog"
+journal_filename = f"thermocouple_data_{current_time}.journal"
+parquet_filename = f"thermocouple_data_{current_time}.parquet"
+phases_filename = f"thermocouple_data_{current_time}_phases.json"
+
+# Initialize sample store, with columns generated from the channels
+data_store = SampleStore(channels.columns)  # NumPy columns; Time is stored as epoch nanoseconds
+csv_writer = IncrementalCSVWriter(filename, channels.columns, fsync=journal, tz=timezone)  # Journal compaction needs rows on disk
+binary_writer = BinaryLogWriter(binary_filename, channels.columns)
+sqlite_store = SQLiteSampleStore(database_file, channels.columns, firing_id=current_time,
+                                 synchronous='FULL' if journal else 'NORMAL') if storage_engine == 'sqlite' else None
+rate_smoother = StreamingMean(smoothing_window, channels=len(channels))  # Moving average of every raw rate
+slope_horizons = [*([rate_window] if rate_window else []), *channels.rate_horizons]
+# One engine fits the rate over rate_window and every horizon
+rate_slopes = MultiHorizonRates(slope_horizons, channels=len(channels)) if slope_horizons else None
+kalman = KalmanRate(len(channels), measurement_noise=kalman_measurement_noise,
+                    process_noise=kalman_process_noise) if kalman_filter else None
+rollups = RollupSet(channels.columns, tiers=rollup_tiers)  # Coarser copies of the log for long time ranges
+outlier_filter = HampelFilter(len(channels), window=outlier_window, threshold=outlier_threshold,
+                              min_deviation=outlier_min_deviation, action=outlier_action)
+phases = PhaseSegmenter(hold_rate=phase_hold_rate, threshold=phase_threshold) if phase_detection else None
+average_temperature_index = channels.columns.index(channels.average_temperature_column)
+average_rate_index = channels.columns.index(channels.average_rate_column)
+
+# High-rate mode also keeps every raw reading for analysis
+raw_store = SampleStore(channels.raw_columns, max_rows=raw_buffer_rows)
+raw_writer = IncrementalCSVWriter(raw_filename, channels.raw_columns, tz=timezone)
+
+# Plot configurations, one per panel and one line per channel
+# modify rate_ylim to bounds of viewing choice
+plot_configs = channels.plot_configs(rate_ylim=(-500, 1000), rate_panel='kalman' if kalman_filter else 'moving_average')
 
 # Setup for live plotting
 plt.ion()
-fig, axs = plt.subplots(3, 1, figsize=(10, 7))
+fig, axs = plt.subplots(len(plot_configs), 1, figsize=(10, 7 * len(plot_configs) / 3))
 plt.subplots_adjust(hspace=0.3)
+plotter = LivePlotter(fig, axs, plot_configs, max_points=500, tz=timezone, message_rows=len(channels))
 
-def validate_data(current_temp_1, current_temp_2, last_temp_1, last_temp_2):
+def validate_data(current_temps):
     """
-    Validates the temperature data to ensure no unreasonable fluctuations.
-    Returns False if data is invalid.
+    Checks every channel against its own rolling median and the -100..3000 °F range.
+    Returns the temperatures with only the bad channels flagged (NaN) or repaired,
+    so a glitch on one probe does not cost the readings of the others.
     """
-    if last_temp_1 is not None and abs(current_temp_1 - last_temp_1) >= 500:
-        logging.warning(f"Temperature Sensor 1: Change exceeds limit. Skipping this reading: {current_temp_1}°F (last: {last_temp_1}°F)")
-        return False
-    if last_temp_2 is not None and abs(current_temp_2 - last_temp_2) >= 500:
-        logging.warning(f"Temperature Sensor 2: Change exceeds limit. Skipping this reading: {current_temp_2}°F (last: {last_temp_2}°F)")
-        return False
-
-    if not (-100 <= current_temp_1 <= 3000 and -100 <= current_temp_2 <= 3000):
-        logging.warning("Temperature out of range. Skipping this reading.")
-        return False
+    checked, outliers = outlier_filter.update(current_temps)
+    for i in np.flatnonzero(outliers):
+        logging.warning(f"Temperature {channels.labels[i]}: Outlier, logged as {checked[i]}°F: {current_temps[i]}°F "
+                        f"(median: {outlier_filter.median[i]:.1f}°F)")
+    return checked
 
-    return True
+def read_sensors():
+    """
+    Reads every thermocouple in °F. Runs on the acquisition thread, so it only talks to the chips.
+    Returns None in high-rate mode when there is no new conversion yet.
+    """
+    readings = backend.read()
+    if readings is None:
+        return None
+    return tuple(temp * 9/5 + 32 for temp in readings)  # Convert to Fahrenheit
 
 def log_data():
-    last_temp_1, last_temp_2 = None, None
-    last_write_time = time.time()  # Keep track of the last time we wrote to the CSV
-    sensor1_last_response = time.time()
-    sensor2_last_response = time.time()
-
-    # Create the CSV file with headers initially
-    data_df.to_csv(filename, mode='w', header=True, index=False)
+    last_temps = [None]
+    last_sample_monotonic = [None]
+    sensor_last_response = np.full(len(channels), time.monotonic())
+    store_lock = threading.Lock()  # Guards data_store between the consumers and the display
+    stop_event = threading.Event()
+    storage_stop = threading.Event()
+    sample_queue = SampleQueue(maxsize=queue_size)
+    scheduler = SampleScheduler((conversion_period if high_rate_mode else interval) / time_scale, policy=overrun_policy)
+    decimator = Decimator(interval)
+
+    def derive(sample, validated=False):
+        """
+        Validates one reading (unless validated, as the high-rate buckets are),
+        works out the rates and appends the row to the store.
+        All channels are handled as one array.
+        """
+        current_time, current_monotonic, readings = sample
+        current_temps = np.asarray(readings, dtype=np.float64)
+        last_temps_now = last_temps[0]
+
+        # Validate the data before appending
+        if not validated:
+            current_temps = validate_data(current_temps)
+
+        # Use the real time between accepted samples, not the nominal interval
+        slopes = rate_slopes.update(current_monotonic / 1e9, current_temps) if rate_slopes is not None else None
+        horizons = slopes[1:] if rate_window else slopes
+        if rate_window:
+            rates = slopes[0]
+            if last_temps_now is None:
+                rates = np.zeros(len(channels))  # First row reads 0, as before
+        elif last_temps_now is not None:
+            elapsed = (current_monotonic - last_sample_monotonic[0]) / 1e9
+            rates = (current_temps - last_temps_now) / elapsed * 3600
+        else:
+            rates = np.zeros(len(channels))
+        moving_averages = rate_smoother.update(rates)  # NaN until the window fills, same as rolling()
+        if kalman is not None:
+            kalman.update(current_monotonic / 1e9, current_temps)
+            kalman_values = (kalman.temperature, kalman.rate, kalman.rate_std)
+        else:
+            kalman_values = None
+
+        # Append data to the store (time stays UTC epoch ns; it is localized on export)
+        row = channels.row(current_time // 1000 * 1000,  # Microsecond resolution like the old CSVs
+                           current_temps, rates, moving_averages, horizons, kalman_values)
+        with store_lock:
+            data_store.append(row)
+            rollups.add(row)
+            row_number = data_store.total_rows - 1
+            if phases is not None:
+                phases.update(row[0], row_number, row[average_temperature_index], row[average_rate_index])
+        if sample_journal is not None:
+            sample_journal.append(row_number, row)
+
+        last_temps[0] = current_temps
+        last_sample_monotonic[0] = current_monotonic
+
+    def handle_sample(sample):
+        """
+        In high-rate mode, keeps the raw reading and derives one averaged row per interval.
+        Outliers are rejected per raw reading, before a spike can be averaged into its bucket.
+        """
+        # Update last response time for each sensor that gave a reading (real time, also when replaying)
+        sensor_last_response[~np.isnan(np.asarray(sample[2], dtype=np.float64))] = time.monotonic()
+
+        if not high_rate_mode:
+            derive(sample)
+            return
+        current_time, current_monotonic, readings = sample
+        with store_lock:
+            raw_store.append([current_time // 1000 * 1000, *readings])
+        checked = validate_data(np.asarray(readings, dtype=np.float64))
+        decimated = decimator.add((current_time, current_monotonic, checked))
+        if decimated is not None:
+            derive(decimated, validated=True)
+
+    def write_csv():
+        """
+        Copies the rows not on disk yet under store_lock, then writes them with the
+        lock released, so a slow SD card never holds up derivation or the display.
+        """
+        with store_lock:
+            batch = data_store.snapshot(min(writer.rows_written for writer in writers))
+            raw_batch = raw_store.snapshot(raw_writer.rows_written) if high_rate_mode else None
+            phase_index = None
+            if phases is not None and phases.changed:  # Only when a segment has closed
+                phase_index = phases.index()
+                phases.changed = False
+        for writer in writers:
+            writer.flush(batch)  # Only rows not yet on disk; one transaction per flush for SQLite
+        if raw_batch is not None:
+            raw_writer.flush(raw_batch)
+        if phase_index is not None:
+            save_phases(phases_filename, phase_index, tz=timezone)
+        if sample_journal is not None and main_log.rows_written > sample_journal.durable_rows:
+            sample_journal.compact(main_log.rows_written)  # Rows now safe in the storage engine
+        if sample_queue.dropped:
+            logging.warning(f"Sample queue overflowed: {sample_queue.dropped} samples dropped so far")
+
+    # Finish off any firing that was cut short by a crash or power cut
+    recover_journals(tz=timezone)
+    if firing_sessions:
+        prune_sessions(session_root)  # Sessions from starts that never logged a sample
+        session = FiringSession(session_root, current_time, channels.columns,
+                                peak_columns=[*channels.temperature_columns, channels.average_temperature_column],
+                                segment_seconds=segment_seconds, tz=timezone,
+                                fsync=journal and sqlite_store is None)  # Then it is the main log
+    else:
+        session = None
+
+    # The main log holds the firing as it runs and is what the journal is compacted against;
+    # unless it is the flat CSV, that is exported from it at the end
+    if sqlite_store is not None:
+        main_log = sqlite_store
+    elif session is not None:
+        main_log = session
+    else:
+        main_log = csv_writer
+    writers = [main_log] + [writer for writer in (session, binary_writer if binary_log else None)
+                            if writer is not None and writer is not main_log]
+
+    # The CSV, .klog and raw CSV are created by their first flush, so an aborted start leaves none behind
+    sample_journal = SampleJournal(journal_filename, channels.columns, filename, fsync_interval=journal_fsync_interval,
+                                   database=database_file if sqlite_store is not None else None, firing_id=current_time,
+                                   parquet=parquet_filename if parquet_firing else None,
+                                   session=session_root if session is not None else None) if journal else None
+    backend.start()
+
+    # Acquisition only reads the sensors; derivation and CSV writing run on their own threads
+    acquisition = AcquisitionThread(read_sensors, scheduler, sample_queue, stop_event, clock=backend.clock)
+    derivation = ConsumerThread('derivation', sample_queue, handle_sample, stop_event)
+    storage = PeriodicThread('storage', update_interval, write_csv, storage_stop)
+    for thread in (acquisition, derivation, storage):
+        thread.start()
 
     try:
-        while True:
-            current_time = time.time()
-            try:
-                current_temp_1 = sensor1.temperature * 9/5 + 32  # Convert to Fahrenheit
-                current_temp_2 = sensor2.temperature * 9/5 + 32  # Convert to Fahrenheit
-
-                # Update last response time for each sensor
-                if current_temp_1 is not None:
-                    sensor1_last_response = current_time
-                if current_temp_2 is not None:
-                    sensor2_last_response = current_time
-                
-                # Validate the data before appending
-                if not validate_data(current_temp_1, current_temp_2, last_temp_1, last_temp_2):
-                    continue
-
-            except Exception as e:
-                logging.error(f"Error reading temperatures: {e}")
-                continue
-
-            # Append data to DataFrame with local time
-            local_time = datetime.fromtimestamp(current_time, pytz.timezone('America/New_York'))
-            rate_of_change_1 = (current_temp_1 - last_temp_1) / interval * 3600 if last_temp_1 is not None else 0
-            rate_of_change_2 = (current_temp_2 - last_temp_2) / interval * 3600 if last_temp_2 is not None else 0
-            average_rate_of_change = (rate_of_change_1 + rate_of_change_2) / 2  # Average rate of change
-
-            data_df.loc[len(data_df)] = [
-                local_time,
-                current_temp_1,
-                rate_of_change_1,
-                current_temp_2,
-                rate_of_change_2,
-                (current_temp_1 + current_temp_2) / 2,
-                0,  # Placeholder for moving average
-                0,  # Placeholder for moving average
-                average_rate_of_change  # New column value
-            ]
-
-            last_temp_1, last_temp_2 = current_temp_1, current_temp_2
-            time.sleep(interval)
-
-            # Calculate moving averages before updating CSV
-            if len(data_df) >= smoothing_window:
-                data_df['Moving Average Rate of Change Sensor 1 (°F/h)'] = data_df['Rate of Change Sensor 1 (°F/h)'].rolling(window=smoothing_window).mean()
-                data_df['Moving Average Rate of Change Sensor 2 (°F/h)'] = data_df['Rate of Change Sensor 2 (°F/h)'].rolling(window=smoothing_window).mean()
-
-            # Check if it's time to update the CSV file based on time elapsed
-            if time.time() - last_write_time >= update_interval:
-                try:
-                    data_df.to_csv(filename, mode='a', header=False, index=False)
-                    last_write_time = time.time()  # Update the timestamp
-                except Exception as e:
-                    logging.error(f"Error writing to CSV: {e}")
-
-            # Update plots
-            update_plots(data_df, sensor1_last_response, sensor2_last_response)
+        # The display stays on the main thread, as matplotlib requires
+        while not stop_event.is_set():  # Set when a replay runs out
+            with store_lock:
+                update_plots(data_store, sensor_last_response)
+            fig.canvas.start_event_loop(display_interval)
 
     except KeyboardInterrupt:
         logging.info("Logging stopped by user.")
-        
-        # Save and show the plots
-        plt.ioff()  # Turn off interactive mode
+
+    # Stop reading, let derivation drain the queue, then write whatever is left
+    stop_event.set()
+    acquisition.join()
+    derivation.join()
+    backend.stop()
+    if high_rate_mode:
+        last_bucket = decimator.flush()
+        if last_bucket is not None:
+            derive(last_bucket, validated=True)
+    storage_stop.set()
+    storage.join()
+    if session is not None:
+        session.close()
+    csv_written = main_log is csv_writer
+    if not csv_written:
+        # The CSV stays as an export of the firing
+        try:
+            if session is not None:
+                session.export_csv(filename)  # Copies the segments, no formatting
+            else:
+                csv_writer.flush(data_store)
+            csv_written = True
+        except Exception as e:
+            logging.error(f"Error writing to CSV: {e}")
+    if sqlite_store is not None:
+        sqlite_store.close()
+    if phases is not None and len(data_store):
+        phases.finish()
+        try:
+            phases.save(phases_filename, tz=timezone)
+        except Exception as e:
+            logging.error(f"Error writing firing phases: {e}")
+    parquet_written = not parquet_firing or not len(data_store)
+    if not parquet_written:
+        try:
+            write_firing(data_store.rows(), parquet_filename)
+            parquet_written = True
+        except Exception as e:
+            logging.error(f"Error writing Parquet firing: {e}")
+    if sample_journal is not None:
+        # Keep the journal for recovery unless every engine has the whole firing
+        complete = csv_written and all(writer.rows_written == data_store.total_rows
+                                       for writer in (main_log, session) if writer is not None)
+        sample_journal.close(remove=complete and parquet_written)
+    if archive_file and len(data_store):
+        try:
+            try:
+                archive = ArchiveWriter(archive_file, channels.columns)
+            except ValueError:
+                # The channels or rate columns changed: start a new archive next to the old one
+                root, ext = os.path.splitext(archive_file)
+                archive = ArchiveWriter(f"{root}_{current_time}{ext}", channels.columns)
+            archive.append(data_store.rows())
+        except Exception as e:
+            logging.error(f"Error archiving firing: {e}")
+    logging.info(f"Samples read: {sample_queue.put_count}, dropped: {sample_queue.dropped}, "
+                 f"read errors: {acquisition.read_errors}, max queue depth: {sample_queue.max_depth}")
+    logging.info("Outliers: " + ", ".join(f"{name} {count}" for name, count in zip(channels.names, outlier_filter.rejected)))
+    stats = scheduler.stats()
+    logging.info(f"Sample ticks: {stats['ticks']}, skipped: {stats['skipped']}, "
+                 f"jitter mean {stats['jitter_mean'] * 1000:.1f} ms, std {stats['jitter_std'] * 1000:.1f} ms, "
+                 f"max {stats['jitter_max'] * 1000:.1f} ms")
+
+    # Save and show the plots; the saved figure covers the whole firing
+    with store_lock:
+        plotter.update(rollups.view(data_store, max_points=plotter.max_points))
+    plotter.finish()
+    if phases is not None:
+        plotter.mark_phases(phases.index())
+    plt.ioff()  # Turn off interactive mode
+    if len(data_store):
         plt.savefig(f"temperature_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")  # Save the plot
-        plt.show()  # Show the final plots
-        cleanup()
-
-def update_plots(df, sensor1_last_response, sensor2_last_response):
-    # Clear previous plots
-    for ax in axs:
-        ax.cla()
-
-    # Limit number of data points to plot (last 500 points)
-    max_points = 500
-    plot_data = df.tail(max_points)
-
-    # Check for empty DataFrame
-    if plot_data.empty:
-        return
-
-    # Last data points
-    last_temp1 = plot_data['Temperature Sensor 1 (°F)'].iloc[-1]
-    last_temp2 = plot_data['Temperature Sensor 2 (°F)'].iloc[-1]
-    
-    # Set consistent limits for y-axis
-    min_temp = plot_data[['Temperature Sensor 1 (°F)', 'Temperature Sensor 2 (°F)']].min().min() - 5
-    max_temp = plot_data[['Temperature Sensor 1 (°F)', 'Temperature Sensor 2 (°F)']].max().max() + 5
-
-    axs[0].plot(plot_data['Time'], plot_data['Temperature Sensor 1 (°F)'], label='Sensor 1')
-    axs[0].plot(plot_data['Time'], plot_data['Temperature Sensor 2 (°F)'], label='Sensor 2')
-    axs[0].set_title('Temperature vs Time')
-    axs[0].set_xlabel('Time')
-    axs[0].set_ylabel('Temperature (°F)')
-    axs[0].legend()
-    axs[0].set_ylim(min_temp, max_temp)
+    plt.show()  # Show the final plots
+    cleanup()
 
+def update_plots(store, sensor_last_response):
     # Check for timeouts and show error message
-    sensor1_timeout = time.time() - sensor1_last_response > max_timeout_intervals * interval
-    sensor2_timeout = time.time() - sensor2_last_response > max_timeout_intervals * interval
-
-    if sensor1_timeout:
-        axs[0].text(0.5, 0.9, f"ERROR: Sensor 1 timeout {int(time.time() - sensor1_last_response)}s", 
-                    transform=axs[0].transAxes, color='red', fontsize=12, ha='center')
-    if sensor2_timeout:
-        axs[0].text(0.5, 0.8, f"ERROR: Sensor 2 timeout {int(time.time() - sensor2_last_response)}s", 
-                    transform=axs[0].transAxes, color='red', fontsize=12, ha='center')
+    silent = time.monotonic() - sensor_last_response
+    messages = [f"ERROR: {channels.labels[i]} timeout {int(silent[i])}s"
+                for i in np.flatnonzero(silent > max_timeout_intervals * interval / time_scale)]
 
-    plt.draw()
+    if plot_view == 'firing':
+        store = rollups.view(store, max_points=plotter.max_points)  # Whole firing in at most max_points points
+    plotter.update(store, messages)
 
 def cleanup():
     plt.close()
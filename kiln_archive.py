@@ -0,0 +1,275 @@
+import argparse
+import logging
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from kiln_binlog import pack_header, read_header as _read_framed_header
+from kiln_loader import load_log
+
+# File layout: MAGIC | header length (uint32) | JSON header | blocks
+# Each block: _BLOCK header (payload bytes, rows, first time ns, last time ns) | payload
+# The payload is one section per column, each prefixed with its length (uint32),
+# time first, so a reader can skip the columns (and blocks) it does not need.
+MAGIC = b'KILNGOR1'
+_LENGTH = struct.Struct('<I')
+_BLOCK = struct.Struct('<IIqq')
+_TIME_SECTION = struct.Struct('<qB')   # first delta, bit width of the delta-of-deltas
+_FLOAT_SECTION = struct.Struct('<QBB')  # first value bits, bits per leading-zero count, bits per width
+
+
+def _pack_bits(values, width):
+    """
+    Packs unsigned ints, each below 2**width, into a big-endian bit string.
+    """
+    if width == 0 or len(values) == 0:
+        return b''
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    bits = ((values[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+    return np.packbits(bits.ravel()).tobytes()
+
+
+def _unpack_bits(data, count, width):
+    if width == 0 or count == 0:
+        return np.zeros(count, dtype=np.uint64)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count * width).reshape(count, width)
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    return np.bitwise_or.reduce(bits.astype(np.uint64) << shifts, axis=1)
+
+
+def _encode_times(times):
+    """
+    Delta-of-delta encoding: samples arrive at a nearly fixed interval, so the
+    change in the gap between samples is close to zero and needs few bits.
+    """
+    deltas = np.diff(times)
+    first_delta = int(deltas[0]) if len(deltas) else 0
+    dods = np.diff(deltas)
+    zigzag = ((dods << 1) ^ (dods >> 63)).view(np.uint64)  # Small negative numbers become small positive ones
+    width = int(np.bitwise_or.reduce(zigzag)).bit_length() if len(zigzag) else 0
+    return _TIME_SECTION.pack(first_delta, width) + _pack_bits(zigzag, width)
+
+
+def _decode_times(data, first, rows):
+    first_delta, width = _TIME_SECTION.unpack_from(data)
+    zigzag = _unpack_bits(data[_TIME_SECTION.size:], max(rows - 2, 0), width)
+    dods = (zigzag >> np.uint64(1)).view(np.int64) ^ -(zigzag & np.uint64(1)).view(np.int64)
+    deltas = np.concatenate([[first_delta], first_delta + np.cumsum(dods)])[:max(rows - 1, 0)]
+    return np.concatenate([[first], first + np.cumsum(deltas)]).astype(np.int64)
+
+
+def _pack_varbits(values, widths):
+    """
+    Packs values[i] in widths[i] bits each, back to back, into a bit string.
+    """
+    if len(values) == 0 or not widths.any():
+        return b''
+    j = np.arange(64, dtype=np.int64)
+    shifts = np.clip(widths[:, None] - 1 - j, 0, 63).astype(np.uint64)
+    bits = ((values[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+    return np.packbits(bits[j < widths[:, None]]).tobytes()
+
+
+def _unpack_varbits(data, widths):
+    total = int(widths.sum())
+    if total == 0:
+        return np.zeros(len(widths), dtype=np.uint64)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=total)
+    j = np.arange(64, dtype=np.int64)
+    used = j < widths[:, None]
+    index = np.where(used, (np.cumsum(widths) - widths)[:, None] + j, 0)
+    shifts = np.clip(widths[:, None] - 1 - j, 0, 63).astype(np.uint64)
+    return np.bitwise_or.reduce(np.where(used, bits[index].astype(np.uint64) << shifts, np.uint64(0)), axis=1)
+
+
+def _leading_zeros(values):
+    """
+    Counts the leading zero bits of each uint64 (64 for zero), by binary search on the bit length.
+    """
+    count = np.zeros(len(values), dtype=np.int64)
+    remaining = values.copy()
+    for step in (32, 16, 8, 4, 2, 1):
+        high = (remaining >> np.uint64(64 - step)) == 0
+        count += np.where(high, step, 0)
+        remaining = np.where(high, remaining << np.uint64(step), remaining)
+    return count + (remaining == 0)
+
+
+def _trailing_zeros(values):
+    lowest = values & (~values + np.uint64(1))  # Only the lowest set bit survives
+    return np.where(values == 0, 0, 63 - _leading_zeros(lowest))
+
+
+def _encode_floats(values):
+    """
+    Gorilla-style XOR encoding: each value is XORed with the one before it.
+    Slowly changing temperatures share sign, exponent and the top of the
+    mantissa, so the XOR starts with a run of zero bits, and often ends with
+    one; only the bits in between are stored. Gorilla interleaves a control
+    code with every value and has to be decoded one value at a time. Here the
+    leading-zero counts and widths go in their own packed streams, so a
+    whole block is encoded and decoded with array operations.
+    """
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xors = bits[1:] ^ bits[:-1]
+    leading = np.where(xors == 0, 0, _leading_zeros(xors))
+    widths = np.where(xors == 0, 0, 64 - leading - _trailing_zeros(xors))
+    lead_bits = int(leading.max()).bit_length() if len(xors) else 0
+    width_bits = int(widths.max()).bit_length() if len(xors) else 0
+    meaningful = xors >> (64 - leading - widths).astype(np.uint64)
+    return (_FLOAT_SECTION.pack(int(bits[0]), lead_bits, width_bits) +
+            _pack_bits(leading.astype(np.uint64), lead_bits) + _pack_bits(widths.astype(np.uint64), width_bits) +
+            _pack_varbits(meaningful, widths))
+
+
+def _decode_floats(data, rows):
+    first, lead_bits, width_bits = _FLOAT_SECTION.unpack_from(data)
+    count = rows - 1
+    position = _FLOAT_SECTION.size
+    leading = _unpack_bits(data[position:], count, lead_bits).astype(np.int64)
+    position += (count * lead_bits + 7) // 8
+    widths = _unpack_bits(data[position:], count, width_bits).astype(np.int64)
+    position += (count * width_bits + 7) // 8
+    meaningful = _unpack_varbits(data[position:], widths)
+    xors = np.where(widths == 0, np.uint64(0), meaningful << (64 - leading - widths).clip(0, 63).astype(np.uint64))
+    bits = np.bitwise_xor.accumulate(np.concatenate([np.array([first], dtype=np.uint64), xors]))
+    return bits.view(np.float64)
+
+
+def _encode_block(columns, names, time_column, start, stop):
+    times = np.asarray(columns[time_column][start:stop], dtype=np.int64)
+    sections = [_encode_times(times)]
+    for name in names:
+        if name != time_column:
+            sections.append(_encode_floats(np.asarray(columns[name][start:stop], dtype=np.float64)))
+    payload = b''.join(_LENGTH.pack(len(section)) + section for section in sections)
+    return _BLOCK.pack(len(payload), stop - start, int(times[0]), int(times[-1])) + payload
+
+
+class ArchiveWriter:
+    """
+    Appends samples to a compressed archive in blocks of block_rows rows. The
+    file can hold one firing or be appended to for months; every block is
+    self-contained and carries its time range, so readers can skip to the
+    blocks they need.
+    """
+
+    def __init__(self, filename, columns, block_rows=1024, time_column='Time'):
+        self.filename = filename
+        self.columns = list(columns)
+        self.block_rows = block_rows
+        self.time_column = time_column
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            with open(filename, 'wb') as f:
+                f.write(pack_header(MAGIC, {'version': 1, 'time_column': time_column, 'columns': self.columns}))
+        elif read_header(filename)[0]['columns'] != self.columns:
+            raise ValueError(f"{filename} holds different columns")
+
+    def append(self, columns):
+        """
+        Encodes {name: array} (time in epoch ns) and appends it. Returns the bytes written.
+        """
+        rows = len(columns[self.time_column])
+        blocks = [_encode_block(columns, self.columns, self.time_column, start, min(start + self.block_rows, rows))
+                  for start in range(0, rows, self.block_rows)]
+        data = b''.join(blocks)
+        with open(self.filename, 'ab') as f:
+            f.write(data)
+        return len(data)
+
+
+def read_header(filename):
+    """
+    Returns (header dict, byte offset of the first block).
+    """
+    return _read_framed_header(filename, MAGIC, 'kiln archive')
+
+
+def iter_blocks(filename, columns=None, start_ns=None, end_ns=None):
+    """
+    Decodes an archive one block at a time, yielding {name: array} with time in
+    epoch ns. Only blocks overlapping start_ns..end_ns are read, only the
+    requested columns are decoded, and rows outside the range are trimmed.
+    """
+    header, offset = read_header(filename)
+    time_column = header['time_column']
+    wanted = set(header['columns'] if columns is None else [time_column, *columns])
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        while True:
+            block_header = f.read(_BLOCK.size)
+            if len(block_header) < _BLOCK.size:
+                return
+            size, rows, first_ns, last_ns = _BLOCK.unpack(block_header)
+            if (start_ns is not None and last_ns < start_ns) or (end_ns is not None and first_ns > end_ns):
+                f.seek(size, os.SEEK_CUR)
+                continue
+            payload = f.read(size)
+            if len(payload) < size:
+                return  # Torn last block
+
+            block = {}
+            position = 0
+            for name in header['columns']:
+                (length,) = _LENGTH.unpack_from(payload, position)
+                position += _LENGTH.size
+                if name in wanted:
+                    section = payload[position:position + length]
+                    if name == time_column:
+                        block[name] = _decode_times(section, first_ns, rows)
+                    else:
+                        block[name] = _decode_floats(section, rows)
+                position += length
+
+            keep = slice(None)
+            times = block[time_column]
+            if (start_ns is not None and first_ns < start_ns) or (end_ns is not None and last_ns > end_ns):
+                low = 0 if start_ns is None else np.searchsorted(times, start_ns, side='left')
+                high = rows if end_ns is None else np.searchsorted(times, end_ns, side='right')
+                keep = slice(low, high)
+            yield {name: block[name][keep] for name in header['columns'] if name in block}
+
+
+def read_archive(filename, columns=None, start_ns=None, end_ns=None, tz='America/New_York'):
+    """
+    Reads (part of) an archive as a DataFrame like the CSV logs.
+    """
+    header, _ = read_header(filename)
+    time_column = header['time_column']
+    names = [name for name in header['columns'] if columns is None or name == time_column or name in columns]
+    blocks = list(iter_blocks(filename, columns, start_ns, end_ns))
+    data = {}
+    for name in names:
+        empty = np.empty(0, dtype=np.int64 if name == time_column else np.float64)
+        data[name] = np.concatenate([block[name] for block in blocks]) if blocks else empty
+    data[time_column] = pd.to_datetime(data[time_column], unit='ns', utc=True).tz_convert(tz)
+    return pd.DataFrame(data, columns=names)
+
+
+def convert_csv(csv_filename, archive_filename=None, block_rows=1024):
+    """
+    Archives a thermocouple CSV log (losslessly: decoding gives back the exact
+    float64 values). Returns (archive file name, CSV bytes, archive bytes).
+    """
+    if archive_filename is None:
+        archive_filename = os.path.splitext(csv_filename)[0] + '.kga'
+    df = load_log(csv_filename, cache=False)
+    columns = {name: df[name].to_numpy() for name in df.columns}
+    if os.path.exists(archive_filename):
+        os.remove(archive_filename)
+    ArchiveWriter(archive_filename, list(df.columns), block_rows, df.columns[0]).append(columns)
+    sizes = os.path.getsize(csv_filename), os.path.getsize(archive_filename)
+    logging.info(f"Archived {csv_filename} ({sizes[0]} bytes) to {archive_filename} ({sizes[1]} bytes)")
+    return archive_filename, *sizes
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compress thermocouple CSV logs into .kga archives.")
+    parser.add_argument('csv_files', nargs='+')
+    parser.add_argument('--block-rows', type=int, default=1024)
+    args = parser.parse_args()
+    for csv_file in args.csv_files:
+        convert_csv(csv_file, block_rows=args.block_rows)
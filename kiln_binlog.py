@@ -0,0 +1,183 @@
+import argparse
+import json
+import logging
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+# File layout:
+#   MAGIC (8 bytes) | header length (uint32, little endian) | JSON header, space-padded
+#   so records start on an 8-byte boundary | fixed-size records back to back
+# Each record is the epoch time in ns (int64) followed by one float per column.
+MAGIC = b'KILNLOG1'
+_LENGTH = struct.Struct('<I')
+
+
+def record_dtype(columns, float_format='<f8', time_column='Time'):
+    """
+    Returns the NumPy structured dtype of one record.
+    """
+    return np.dtype([(name, '<i8' if name == time_column else float_format) for name in columns])
+
+
+def pack_header(magic, header, align=1):
+    """
+    Frames a JSON header as magic | length (uint32, little endian) | JSON, the
+    JSON space-padded so what follows starts on an `align`-byte boundary.
+    The binary log, the journal and the archive all start this way.
+    """
+    body = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    body += b' ' * (-(len(magic) + _LENGTH.size + len(body)) % align)
+    return magic + _LENGTH.pack(len(body)) + body
+
+
+def read_header(filename, magic=MAGIC, kind='kiln binary log'):
+    """
+    Returns (header dict, byte offset of the first record) of a file framed by pack_header.
+    """
+    with open(filename, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{filename} is not a {kind}")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length).decode('utf-8'))
+    return header, len(magic) + _LENGTH.size + length
+
+
+def _header_bytes(columns, float_format, time_column):
+    header = {
+        'version': 1,
+        'time_column': time_column,
+        'time_unit': 'ns since 1970-01-01 UTC',
+        'columns': list(columns),
+        'formats': ['<i8' if name == time_column else float_format for name in columns],
+        'record_size': record_dtype(columns, float_format, time_column).itemsize,
+    }
+    return pack_header(MAGIC, header, align=8)
+
+
+class BinaryLogWriter:
+    """
+    Appends samples to a fixed-record binary log. Like IncrementalCSVWriter it
+    keeps a high-water mark, so each flush writes only the new rows. A record is
+    8 bytes of time plus 4 (float32) or 8 (float64) bytes per column, against
+    ~150 bytes for a CSV row. The file is created by the first flush that has rows.
+    """
+
+    def __init__(self, filename, columns, float_format='<f8', time_column='Time'):
+        self.filename = filename
+        self.columns = list(columns)
+        self.float_format = float_format
+        self.time_column = time_column
+        self.dtype = record_dtype(self.columns, float_format, time_column)
+        self.rows_written = 0
+        self.created = False
+
+    def write_header(self):
+        """
+        Creates (or truncates) the file and writes the header.
+        """
+        with open(self.filename, 'wb') as f:
+            f.write(_header_bytes(self.columns, self.float_format, self.time_column))
+        self.rows_written = 0
+        self.created = True
+
+    def flush(self, store):
+        """
+        Appends the rows of a SampleStore that are not on disk yet. Returns the number written.
+        """
+        start = self.rows_written
+        stop = store.total_rows
+        if stop <= start:
+            return 0
+        if not self.created:
+            self.write_header()
+
+        columns = store.rows(start, stop)
+        records = np.empty(len(columns[self.time_column]), dtype=self.dtype)
+        for name in self.columns:
+            records[name] = columns[name]
+        with open(self.filename, 'ab') as f:
+            f.write(records.tobytes())
+        self.rows_written = stop
+        return stop - start
+
+
+def write_binary_log(filename, records, time_column='Time'):
+    """
+    Writes a whole binary log at once from a structured array of records.
+    """
+    float_formats = [records.dtype.fields[name][0].str for name in records.dtype.names if name != time_column]
+    float_format = float_formats[0] if float_formats else '<f8'
+    with open(filename, 'wb') as f:
+        f.write(_header_bytes(records.dtype.names, float_format, time_column))
+        f.write(records.tobytes())
+    return filename
+
+
+def open_binary_log(filename):
+    """
+    Memory-maps a binary log and returns (records, header). records is a read-only
+    structured array; opening is instant and only the pages that are touched are read.
+    A partly written last record (e.g. after a power cut) is left out.
+    """
+    header, offset = read_header(filename)
+    dtype = np.dtype(list(zip(header['columns'], header['formats'])))
+    count = (os.path.getsize(filename) - offset) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype), header
+    return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(count,)), header
+
+
+def to_epoch_ns(times):
+    """
+    Converts timezone-aware times (a Series or DatetimeIndex) to int64 epoch
+    nanoseconds, the time unit of every kiln file. Time strings go through
+    kiln_loader.parse_times instead.
+    """
+    return np.asarray((times - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(nanoseconds=1), dtype=np.int64)
+
+
+def to_dataframe(records, time_column='Time', tz='America/New_York'):
+    """
+    Converts binary log records (or a slice of them) to a DataFrame like the CSV logs.
+    """
+    data = {}
+    for name in records.dtype.names:
+        values = np.asarray(records[name])
+        if name == time_column:
+            values = pd.to_datetime(values, unit='ns', utc=True).tz_convert(tz)
+        data[name] = values
+    return pd.DataFrame(data, columns=list(records.dtype.names))
+
+
+def convert_csv(csv_filename, binary_filename=None, float_format='<f8'):
+    """
+    Converts a thermocouple_data_*.csv log to the binary format, row for row.
+    Returns the binary file name.
+    """
+    if binary_filename is None:
+        binary_filename = os.path.splitext(csv_filename)[0] + '.klog'
+
+    df = pd.read_csv(csv_filename)
+    columns = list(df.columns)
+    time_column = columns[0]
+    records = np.empty(len(df), dtype=record_dtype(columns, float_format, time_column))
+    records[time_column] = to_epoch_ns(pd.to_datetime(df[time_column], utc=True, format='ISO8601'))
+    for name in columns[1:]:
+        records[name] = df[name].to_numpy(dtype=np.float64)
+
+    write_binary_log(binary_filename, records, time_column)
+    logging.info(f"Converted {csv_filename} ({len(df)} rows) to {binary_filename}")
+    return binary_filename
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert thermocouple CSV logs to the binary log format.")
+    parser.add_argument('csv_files', nargs='+')
+    parser.add_argument('--float32', action='store_true', help="store temperatures and rates as float32")
+    args = parser.parse_args()
+    for csv_file in args.csv_files:
+        convert_csv(csv_file, float_format='<f4' if args.float32 else '<f8')
@@ -0,0 +1,154 @@
+import numpy as np
+
+
+def horizon_label(seconds):
+    """
+    Short name for a rate horizon: 60 -> '1 min', 3600 -> '1 h'.
+    """
+    if seconds % 3600 == 0:
+        return f'{seconds // 3600} h'
+    if seconds % 60 == 0:
+        return f'{seconds // 60} min'
+    return f'{seconds} s'
+
+
+def _mean_of_valid(values):
+    valid = values[~np.isnan(values)]
+    return valid.mean() if len(valid) else np.nan
+
+
+class ChannelRegistry:
+    """
+    The thermocouple channels in use, built from a list of config dicts:
+        {"name": "T1", "label": "Sensor 1", "cs_pin": "D5"}
+    Column names, store rows and plot series are all generated from here, so
+    adding a probe is one more entry in the config.
+    Column order matches the original two-probe CSVs; the rate over each of
+    rate_horizons (seconds) gets its own column per channel, after those.
+    kalman=True adds the Kalman filter's temperature, rate and rate standard
+    deviation for every channel at the end.
+    """
+
+    def __init__(self, channel_configs, rate_horizons=(), kalman=False):
+        if not channel_configs:
+            raise ValueError("At least one thermocouple channel must be configured")
+        self.channels = [dict(config) for config in channel_configs]
+        self.names = [config["name"] for config in self.channels]
+        self.labels = [config.get("label", config["name"]) for config in self.channels]
+        self.cs_pins = [config.get("cs_pin") for config in self.channels]
+
+        self.temperature_columns = [f'Temperature {label} (°F)' for label in self.labels]
+        self.rate_columns = [f'Rate of Change {label} (°F/h)' for label in self.labels]
+        self.moving_average_columns = [f'Moving Average Rate of Change {label} (°F/h)' for label in self.labels]
+        self.average_temperature_column = 'Average Temperature (°F)'
+        self.average_rate_column = 'Average Rate of Change (°F/h)'
+        self.rate_horizons = list(rate_horizons)
+        self.horizon_columns = [[f'Rate of Change {label} over {horizon_label(horizon)} (°F/h)' for label in self.labels]
+                                for horizon in self.rate_horizons]
+        self.kalman = kalman
+        self.kalman_temperature_columns = [f'Kalman Temperature {label} (°F)' for label in self.labels] if kalman else []
+        self.kalman_rate_columns = [f'Kalman Rate of Change {label} (°F/h)' for label in self.labels] if kalman else []
+        self.kalman_rate_std_columns = [f'Kalman Rate Std {label} (°F/h)' for label in self.labels] if kalman else []
+
+        self.columns = ['Time']
+        for temperature, rate in zip(self.temperature_columns, self.rate_columns):
+            self.columns += [temperature, rate]
+        self.columns += [self.average_temperature_column, *self.moving_average_columns, self.average_rate_column]
+        for columns in self.horizon_columns:
+            self.columns += columns
+        for columns in zip(self.kalman_temperature_columns, self.kalman_rate_columns, self.kalman_rate_std_columns):
+            self.columns += columns
+        self.raw_columns = ['Time', *self.temperature_columns]
+
+        # Where each block of values lands among the non-time columns, so a row is a few array assignments
+        index = {name: i - 1 for i, name in enumerate(self.columns)}
+        self._temperature_index = np.array([index[c] for c in self.temperature_columns])
+        self._rate_index = np.array([index[c] for c in self.rate_columns])
+        self._moving_average_index = np.array([index[c] for c in self.moving_average_columns])
+        self._average_temperature_index = index[self.average_temperature_column]
+        self._average_rate_index = index[self.average_rate_column]
+        self._horizon_index = np.array([[index[c] for c in columns] for columns in self.horizon_columns], dtype=np.int64)
+        self._kalman_index = np.array([[index[c] for c in columns] for columns in
+                                       (self.kalman_temperature_columns, self.kalman_rate_columns,
+                                        self.kalman_rate_std_columns)], dtype=np.int64) if kalman else None
+
+    def __len__(self):
+        return len(self.channels)
+
+    def row(self, time_ns, temperatures, rates, moving_averages, horizon_rates=None, kalman=None):
+        """
+        Returns one store row (in column order) from per-channel arrays.
+        horizon_rates is (horizons, channels), e.g. from MultiHorizonRates;
+        kalman is (temperatures, rates, rate stds), e.g. from KalmanRate.
+        """
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        rates = np.asarray(rates, dtype=np.float64)
+        values = np.empty(len(self.columns) - 1)
+        values[self._temperature_index] = temperatures
+        values[self._rate_index] = rates
+        values[self._moving_average_index] = moving_averages
+        values[self._average_temperature_index] = _mean_of_valid(temperatures)  # A flagged probe drops out
+        values[self._average_rate_index] = _mean_of_valid(rates)
+        if self.rate_horizons:
+            values[self._horizon_index] = horizon_rates
+        if self.kalman:
+            values[self._kalman_index] = kalman
+        return [time_ns, *values.tolist()]
+
+    def plot_configs(self, rate_ylim=(-500, 1000), rate_panel='moving_average'):
+        """
+        Returns the live-plot panels (temperature, moving-average RoC, raw RoC,
+        and the multi-horizon rates if any) with one line per channel.
+        rate_panel='kalman' shows the Kalman rate in place of the moving average.
+        """
+        def last_text(unit):
+            return "\n".join(f"Last {name}: {{{i}:.2f}} {unit}" for i, name in enumerate(self.names))
+
+        return [
+            {
+                "columns": [*self.temperature_columns, self.average_temperature_column],
+                "labels": [*(f'{name} (°F)' for name in self.names), 'Avg (°F)'],
+                "title": 'Total Temperature Data from Thermocouples',
+                "ylabel": 'Temperature (°F)',
+                "ylim": None,  # Follow the data
+                "last_text": last_text('°F'),
+                "last_text_x": 0.35,
+            },
+            {
+                "columns": self.kalman_rate_columns,
+                "labels": [f'Kalman RoC {name} (°F/h)' for name in self.names],
+                "title": 'Kalman Filtered Rate of Change of Temperature (°F/h)',
+                "ylabel": 'Rate of Change (°F/h)',
+                "ylim": rate_ylim,
+                "last_text": last_text('°F/hr'),
+                "last_text_x": 0.45,
+            } if rate_panel == 'kalman' and self.kalman else {
+                "columns": self.moving_average_columns,
+                "labels": [f'MvAvg RoC {name} (°F/h)' for name in self.names],
+                "title": 'Moving Average Rate of Change of Temperature (°F/h)',
+                "ylabel": 'Rate of Change (°F/h)',
+                "ylim": rate_ylim,
+                "last_text": last_text('°F/hr'),
+                "last_text_x": 0.45,
+            },
+            {
+                "columns": self.rate_columns,
+                "labels": [f'Raw RoC {name} (°F/h)' for name in self.names],
+                "title": 'Raw Rate of Change of Temperature (°F/h)',
+                "ylabel": 'Raw Rate of Change (°F/h)',
+                "ylim": rate_ylim,
+                "last_text": last_text('°F/hr'),
+                "last_text_x": 0.45,
+            },
+            *([{
+                "columns": [column for columns in zip(*self.horizon_columns) for column in columns],
+                "labels": [f'{name} {horizon_label(horizon)} (°F/h)' for name in self.names for horizon in self.rate_horizons],
+                "title": f'Rate of Change over {" / ".join(horizon_label(h) for h in self.rate_horizons)} (°F/h)',
+                "ylabel": 'Rate of Change (°F/h)',
+                "ylim": rate_ylim,
+                "last_text": "\n".join(f"{name}: " + " / ".join(f"{{{i * len(self.rate_horizons) + j}:.0f}}"
+                                                             for j in range(len(self.rate_horizons))) + " °F/hr"
+                                       for i, name in enumerate(self.names)),
+                "last_text_x": 0.45,
+            }] if self.rate_horizons else []),
+        ]
@@ -0,0 +1,306 @@
+import glob
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from kiln_binlog import pack_header, read_header, record_dtype, to_dataframe, to_epoch_ns
+from kiln_csv import truncate_torn_line
+from kiln_loader import load_log
+from kiln_segments import write_firing
+from kiln_sessions import FiringSession
+from kiln_sqlite import SQLiteSampleStore, query_samples
+from kiln_store import SampleStore
+
+# File layout: MAGIC | header length (uint32) | JSON header | records
+# Each record is the row number (uint64), the sample in binary log layout and a CRC32 of both.
+MAGIC = b'KILNJRN1'
+
+
+def _journal_dtype(columns, time_column='Time'):
+    sample = record_dtype(columns, '<f8', time_column)
+    return np.dtype([('row', '<u8'), *[(name, sample.fields[name][0]) for name in sample.names], ('crc', '<u4')])
+
+
+class SampleJournal:
+    """
+    Append-only journal that records each sample as soon as it is derived, so a
+    power cut between CSV flushes loses at most the last fsync interval.
+    Every append is written straight to the OS. fsync is batched (group commit):
+    it runs once fsync_interval seconds or fsync_every records have built up,
+    not once per row. Records are fixed-size and carry a CRC, so a torn write
+    at the end is recognised and ignored.
+
+    Once the storage engine has the rows safely on disk up to some row,
+    compact() drops them from the journal. Rows are journaled in consecutive
+    row order, so the rows to drop are a prefix whose length in bytes is known
+    without reading the file back. If the logger dies, recover_journals() at
+    the next start writes whatever is missing into the engine the firing used:
+    the target CSV, or the SQLite database when database is given, and the
+    firing session when session (its root directory; firing_id is the session
+    id) is given. The target CSV is then exported again from the database or
+    the session, and the Parquet file written when parquet is given.
+    """
+
+    def __init__(self, path, columns, target, fsync_interval=30.0, fsync_every=None, time_column='Time',
+                 database=None, firing_id=None, parquet=None, session=None):
+        self.path = path
+        self.columns = list(columns)
+        self.target = target
+        self.database = database
+        self.firing_id = firing_id
+        self.session = session
+        self.parquet = parquet
+        self.time_column = time_column
+        self.fsync_interval = fsync_interval
+        self.fsync_every = fsync_every
+        self.dtype = _journal_dtype(self.columns, time_column)
+        self.lock = threading.Lock()
+        self.unsynced = 0
+        self.syncs = 0
+        self._last_sync = time.monotonic()
+        self.first_row = None  # Row number of the first record in the file
+        self.records = 0  # Records in the file
+        self._fd = None
+        self._open(truncate=True)
+
+    @property
+    def durable_rows(self):
+        """
+        Rows below this number have been compacted away (the engine had them on disk).
+        """
+        return 0 if self.first_row is None else self.first_row
+
+    def _header(self):
+        header = {'version': 1, 'target': self.target, 'time_column': self.time_column,
+                  'columns': self.columns, 'record_size': self.dtype.itemsize,
+                  'database': self.database, 'firing_id': self.firing_id, 'parquet': self.parquet,
+                  'session': self.session}
+        return pack_header(MAGIC, header)
+
+    def _open(self, truncate):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (os.O_TRUNC if truncate else 0)
+        self._fd = os.open(self.path, flags, 0o644)
+        if truncate:
+            os.write(self._fd, self._header())
+            self._sync()
+
+    def _sync(self):
+        os.fsync(self._fd)
+        self.unsynced = 0
+        self.syncs += 1
+        self._last_sync = time.monotonic()
+
+    def append(self, row_number, row):
+        """
+        Journals one sample (a store row in column order) as row number row_number.
+        """
+        record = np.zeros(1, dtype=self.dtype)
+        record['row'] = row_number
+        for name, value in zip(self.columns, row):
+            record[name] = value
+        data = record.tobytes()
+        crc = zlib.crc32(data[:-4])
+        data = data[:-4] + struct.pack('<I', crc)
+
+        with self.lock:
+            os.write(self._fd, data)
+            if self.first_row is None:
+                self.first_row = row_number
+            self.records += 1
+            self.unsynced += 1
+            if (self.fsync_every is not None and self.unsynced >= self.fsync_every) or \
+                    time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def sync(self):
+        """
+        Forces everything appended so far onto the disk.
+        """
+        with self.lock:
+            if self.unsynced:
+                self._sync()
+
+    def compact(self, durable_rows):
+        """
+        Drops journaled rows below durable_rows (rows the storage engine already
+        has on disk). Only the records still needed are read, from their byte
+        offset, and copied to a new journal that atomically replaces the old one.
+        Returns the number of records dropped.
+        """
+        with self.lock:
+            if self.first_row is None:
+                return 0
+            drop = min(max(durable_rows - self.first_row, 0), self.records)
+            if drop == 0:
+                return 0
+            header = self._header()
+            with open(self.path, 'rb') as f:
+                f.seek(len(header) + drop * self.dtype.itemsize)
+                keep = f.read()
+            temporary = self.path + '.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(header)
+                f.write(keep)
+                f.flush()
+                os.fsync(f.fileno())
+            os.close(self._fd)
+            os.replace(temporary, self.path)
+            self._open(truncate=False)
+            self.first_row += drop
+            self.records -= drop
+            return drop
+
+    def close(self, remove=False):
+        """
+        Syncs and closes the journal; remove=True deletes it (the main log is complete).
+        """
+        with self.lock:
+            if self._fd is None:
+                return
+            self._sync()
+            os.close(self._fd)
+            self._fd = None
+            if remove:
+                os.remove(self.path)
+
+
+def read_journal(path):
+    """
+    Returns (records, header) for every intact record in a journal. Reading stops
+    at the first record that is torn or fails its CRC.
+    """
+    header, offset = read_header(path, MAGIC, 'kiln journal')
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    dtype = _journal_dtype(header['columns'], header['time_column'])
+    count = len(data) // dtype.itemsize
+    records = np.frombuffer(data[:count * dtype.itemsize], dtype=dtype)
+    raw = np.frombuffer(data[:count * dtype.itemsize], dtype=np.uint8).reshape(count, dtype.itemsize)
+    for i in range(count):
+        if zlib.crc32(raw[i, :-4].tobytes()) != records['crc'][i]:
+            records = records[:i]
+            break
+    return records, header
+
+
+def _csv_row_count(filename):
+    """
+    Returns the number of complete data rows in a CSV, cutting off a torn last line.
+    """
+    return max(truncate_torn_line(filename).count(b'\n') - 1, 0)
+
+
+def _recover_csv(records, header, tz):
+    """
+    Appends the journaled rows the target CSV is missing. Returns the number appended.
+    """
+    target = header['target']
+    if not os.path.exists(target):
+        with open(target, 'w', newline='', encoding='utf-8') as f:
+            f.write(','.join(header['columns']) + '\n')
+    missing = records[records['row'] >= _csv_row_count(target)]
+    if len(missing):
+        df = to_dataframe(missing[header['columns']], header['time_column'], tz)
+        with open(target, 'a', newline='', encoding='utf-8') as f:
+            df.to_csv(f, header=False, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+    return len(missing)
+
+
+def _recover_sqlite(records, header, tz):
+    """
+    Inserts the journaled rows into the firing's SQLite database (re-inserting a
+    row the database already has is harmless), then rewrites the target CSV as
+    an export of the whole firing, as a clean shutdown would. Returns the rows inserted.
+    """
+    time_column = header['time_column']
+    database = SQLiteSampleStore(header['database'], header['columns'], header['firing_id'], time_column,
+                                 synchronous='FULL')
+    try:
+        database.insert({name: records[name] for name in header['columns']})
+    finally:
+        database.close()
+    df = query_samples(header['database'], header['firing_id'], tz=tz, time_column=time_column)
+    temporary = header['target'] + '.tmp'
+    df.to_csv(temporary, index=False)
+    os.replace(temporary, header['target'])
+    return len(records)
+
+
+def _recover_session(records, header, tz):
+    """
+    Appends the journaled rows the firing session is missing and closes it.
+    Without a database the session is the main log, so the target CSV is
+    exported from it. Returns the number of rows appended.
+    """
+    session = FiringSession.resume(header['session'], header['firing_id'], header['columns'], tz=tz,
+                                   time_column=header['time_column'], fsync=True)
+    missing = records[records['row'] >= session.rows_written]
+    if len(missing):
+        store = SampleStore.from_columns({name: missing[name] for name in header['columns']}, header['columns'],
+                                         header['time_column'], first_row=int(missing['row'][0]))
+        session.flush(store)
+    session.close()
+    if not header.get('database'):
+        session.export_csv(header['target'])
+    return len(missing)
+
+
+def _recover_parquet(header):
+    """
+    Writes the Parquet copy of the recovered firing from its main log.
+    """
+    time_column = header['time_column']
+    if header.get('database'):
+        df = query_samples(header['database'], header['firing_id'], tz='UTC', time_column=time_column)
+        df[time_column] = to_epoch_ns(df[time_column])
+    else:
+        df = load_log(header['target'], cache=False)
+    if len(df):
+        write_firing({name: df[name].to_numpy() for name in df.columns}, header['parquet'], time_column=time_column)
+
+
+def recover_journals(pattern='thermocouple_data_*.journal', tz='America/New_York'):
+    """
+    Replays journals left behind by a logger that did not shut down cleanly into
+    the storage engine each firing used (see SampleJournal), then removes them.
+    Returns the number of rows recovered.
+    """
+    recovered = 0
+    for path in sorted(glob.glob(pattern)):
+        try:
+            records, header = read_journal(path)
+            if len(records) == 0:
+                os.remove(path)  # The logger stopped before its first sample
+                continue
+            if header.get('database'):
+                count = _recover_sqlite(records, header, tz)
+                destination = f"{header['database']} (firing {header['firing_id']})"
+                if header.get('session'):
+                    _recover_session(records, header, tz)
+            elif header.get('session'):
+                count = _recover_session(records, header, tz)
+                destination = os.path.join(header['session'], header['firing_id'])
+            else:
+                count = _recover_csv(records, header, tz)
+                destination = header['target']
+            logging.info(f"Recovered {count} rows from {path} into {destination}")
+            if header.get('parquet'):
+                try:
+                    _recover_parquet(header)
+                except Exception as e:
+                    logging.error(f"Could not write {header['parquet']} for recovered journal {path}: {e}")
+            recovered += count
+            os.remove(path)
+        except Exception as e:
+            logging.error(f"Could not recover journal {path}: {e}")
+    return recovered
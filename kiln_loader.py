@@ -0,0 +1,215 @@
+import argparse
+import glob
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from kiln_binlog import open_binary_log, record_dtype, to_epoch_ns, write_binary_log
+
+_DIGIT = ord('0')
+
+
+def _digits(digits, start, stop):
+    """
+    Returns the integer value of the digit columns digits[:, start:stop].
+    """
+    return digits[:, start:stop].astype(np.int64) @ (10 ** np.arange(stop - start - 1, -1, -1, dtype=np.int64))
+
+
+def _days_from_civil(year, month, day):
+    """
+    Days since 1970-01-01 of a proleptic Gregorian date, vectorised (H. Hinnant's algorithm).
+    """
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _parse_layout(chars, length):
+    """
+    Parses rows that all share one layout: 'YYYY-MM-DD HH:MM:SS', an optional
+    fraction of 1-9 digits and an optional '+HH:MM' / '-HH:MM' offset (no offset
+    means UTC, like the October logs). Returns epoch ns, or None when the rows
+    do not all match the layout of the first one.
+    """
+    first = chars[0, :length].tobytes()
+    fraction_stop = 19
+    if length > 19 and first[19:20] == b'.':
+        fraction_stop = 20
+        while fraction_stop < length and first[fraction_stop:fraction_stop + 1].isdigit():
+            fraction_stop += 1
+    offset = first[fraction_stop:length]
+    if offset not in (b'', b'Z') and not (len(offset) == 6 and offset[:1] in b'+-' and offset[3:4] == b':'):
+        return None
+
+    fixed = {4: b'-', 7: b'-', 13: b':', 16: b':'}
+    if fraction_stop > 19:
+        fixed[19] = b'.'
+    if len(offset) == 6:
+        fixed[fraction_stop] = offset[:1]
+        fixed[fraction_stop + 3] = b':'
+    positions = list(fixed)
+    if not np.all(chars[:, positions] == np.frombuffer(b''.join(fixed.values()), dtype=np.uint8)):
+        return None
+    if not np.all((chars[:, 10] == ord(' ')) | (chars[:, 10] == ord('T'))):
+        return None
+
+    digits = chars[:, :length] - np.uint8(_DIGIT)  # Anything that is not a digit wraps around to > 9
+    digit_positions = [*range(0, 4), 5, 6, 8, 9, 11, 12, 14, 15, 17, 18, *range(20, fraction_stop)]
+    if len(offset) == 6:
+        digit_positions += [fraction_stop + 1, fraction_stop + 2, fraction_stop + 4, fraction_stop + 5]
+    if not np.all(digits[:, digit_positions] <= 9):
+        return None
+
+    days = _days_from_civil(_digits(digits, 0, 4), _digits(digits, 5, 7), _digits(digits, 8, 10))
+    seconds = days * 86400 + _digits(digits, 11, 13) * 3600 + _digits(digits, 14, 16) * 60 + _digits(digits, 17, 19)
+    ns = seconds * 1_000_000_000
+    if fraction_stop > 20:
+        ns += _digits(digits, 20, fraction_stop) * 10 ** (9 - (fraction_stop - 20))
+    if len(offset) == 6:
+        minutes = _digits(digits, fraction_stop + 1, fraction_stop + 3) * 60 + \
+            _digits(digits, fraction_stop + 4, fraction_stop + 6)
+        ns -= (-1 if offset[:1] == b'-' else 1) * minutes * 60_000_000_000
+    return ns
+
+
+def parse_times(times):
+    """
+    Converts CSV time strings to epoch nanoseconds (int64) without going
+    through datetime objects. Rows are grouped by string length and each group
+    is parsed as fixed-width ASCII, so a whole firing is a handful of NumPy
+    operations. Anything the fast path does not recognise goes to pd.to_datetime.
+    """
+    times = np.asarray(times, dtype=object)
+    result = np.empty(len(times), dtype=np.int64)
+    if len(times) == 0:
+        return result
+    encoded = np.array(times, dtype='S')
+    lengths = np.char.str_len(encoded)
+    chars = encoded.view(np.uint8).reshape(len(encoded), -1)
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        group = chars if len(rows) == len(times) else chars[rows]
+        ns = _parse_layout(group, int(length)) if length >= 19 else None
+        if ns is None:
+            ns = to_epoch_ns(pd.to_datetime(pd.Series(times[rows]), utc=True, format='ISO8601'))
+        result[rows] = ns
+    return result
+
+
+def detect_schema(columns):
+    """
+    Tells the two log layouts apart by their units: the October scripts wrote
+    °C (or °F) and rates per second with 'Filtered ...' columns; rev20 and later
+    write °F and rates in °F/h with 'Moving Average ...' columns.
+    """
+    units = {name[name.rfind('(') + 1:-1] for name in columns if name.endswith(')') and '(' in name}
+    if units & {'°C/s', '°F/s'}:
+        return 'per_second'
+    if '°F/h' in units:
+        return 'per_hour'
+    return 'unknown'
+
+
+def normalize_units(df):
+    """
+    Converts an October (per-second) log in place to the rev20+ units and names:
+    °C becomes °F, °C/s and °F/s become °F/h, and 'Filtered' becomes 'Moving Average'.
+    """
+    renames = {}
+    for name in df.columns:
+        new_name = name
+        if name.endswith('(°C)'):
+            df[name] = df[name] * 9 / 5 + 32
+            new_name = name[:-len('(°C)')] + '(°F)'
+        elif name.endswith('(°C/s)'):
+            df[name] = df[name] * 9 / 5 * 3600
+            new_name = name[:-len('(°C/s)')] + '(°F/h)'
+        elif name.endswith('(°F/s)'):
+            df[name] = df[name] * 3600
+            new_name = name[:-len('(°F/s)')] + '(°F/h)'
+        if new_name.startswith('Filtered Average '):
+            new_name = 'Moving Average ' + new_name[len('Filtered Average '):]
+        elif new_name.startswith('Filtered '):
+            new_name = 'Moving Average ' + new_name[len('Filtered '):]
+        renames[name] = new_name
+    df.rename(columns=renames, inplace=True)
+
+
+def _cache_filename(filename, cache_dir):
+    stat = os.stat(filename)
+    directory = cache_dir if cache_dir is not None else os.path.join(os.path.dirname(filename) or '.', '.kiln_cache')
+    base = os.path.basename(filename)
+    return os.path.join(directory, f'{base}.{stat.st_size}.{stat.st_mtime_ns}.klog'), os.path.join(directory, f'{base}.*.klog')
+
+
+def _read_csv(filename):
+    with open(filename, encoding='utf-8') as f:
+        columns = f.readline().rstrip('\r\n').split(',')
+    dtypes = {name: np.float64 for name in columns[1:]}
+    dtypes[columns[0]] = str
+    df = pd.read_csv(filename, dtype=dtypes, engine='c', float_precision='round_trip')
+    df[columns[0]] = parse_times(df[columns[0]].to_numpy())
+    return df
+
+
+def load_log(filename, columns=None, cache=True, cache_dir=None, normalize=False, tz=None):
+    """
+    Loads a thermocouple CSV log with every value column as float64 and the
+    first (time) column as int64 epoch nanoseconds, or localized to tz if given.
+    columns picks which columns to return (time is always included).
+
+    With cache=True the parsed log is saved as a binary log under .kiln_cache/,
+    named after the CSV's size and modification time, so reopening an unchanged
+    firing only memory-maps that file and reads the columns asked for.
+    normalize=True converts October per-second logs to °F and °F/h.
+    """
+    data = None
+    if cache:
+        cached, stale = _cache_filename(filename, cache_dir)
+        if os.path.exists(cached):
+            records, header = open_binary_log(cached)
+            time_column = header['time_column']
+            schema = detect_schema(header['columns'])
+            names = header['columns'] if columns is None else \
+                [time_column] + [name for name in columns if name != time_column]
+            data = pd.DataFrame({name: np.array(records[name]) for name in names}, columns=names)
+
+    if data is None:
+        data = _read_csv(filename)
+        time_column = data.columns[0]
+        schema = detect_schema(data.columns)
+        if cache:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            for old in glob.glob(stale):
+                os.remove(old)
+            columns_all = list(data.columns)
+            records = np.empty(len(data), dtype=record_dtype(columns_all, '<f8', time_column))
+            for name in columns_all:
+                records[name] = data[name].to_numpy()
+            temporary = cached + '.tmp'
+            write_binary_log(temporary, records, time_column)
+            os.replace(temporary, cached)
+        if columns is not None:
+            data = data[[time_column] + [name for name in columns if name != time_column]]
+
+    if normalize and schema == 'per_second':
+        normalize_units(data)
+    if tz is not None:
+        data[time_column] = pd.to_datetime(data[time_column], unit='ns', utc=True).dt.tz_convert(tz)
+    return data
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Parse thermocouple CSV logs into the loader cache.")
+    parser.add_argument('csv_files', nargs='+')
+    args = parser.parse_args()
+    for csv_file in args.csv_files:
+        df = load_log(csv_file)
+        logging.info(f"{csv_file}: {len(df)} rows, {detect_schema(df.columns)} schema")
@@ -0,0 +1,214 @@
+import math
+import random
+
+import numpy as np
+
+_MAD_SCALE = 1.4826  # MAD * this estimates the standard deviation of normal noise
+
+
+class _Node:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, levels):
+        self.value = value
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+class _IndexableSkiplist:
+    """
+    Sorted multiset of floats with O(log n) insert, remove and lookup by
+    position (R. Hettinger's indexable skiplist). Every link stores how many
+    positions it skips, so the i-th smallest value is found by walking down
+    the levels instead of along the list.
+    """
+
+    def __init__(self, expected_size=100, seed=0):
+        self.size = 0
+        self.levels = int(1 + math.log2(max(expected_size, 2)))
+        self._tail = _Node(math.inf, 0)
+        self._head = _Node(None, self.levels)
+        self._head.next = [self._tail] * self.levels
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        node = self._head
+        i += 1
+        for level in reversed(range(self.levels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        chain = [None] * self.levels
+        steps_at_level = [0] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        height = min(self.levels, 1 - int(math.log2(1.0 - self._random.random())))
+        new = _Node(value, height)
+        steps = 0
+        for level in range(height):
+            previous = chain[level]
+            new.next[level] = previous.next[level]
+            previous.next[level] = new
+            new.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(height, self.levels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target.value != value:
+            raise KeyError(value)
+
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), self.levels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+class RollingMedian:
+    """
+    Median and median absolute deviation (MAD) of the last `window` values.
+    The values are kept sorted in an indexable skiplist, so adding one costs
+    O(log window). The median is two lookups; the MAD is a selection over the
+    distances on either side of the median, which are already sorted, so it
+    takes O(log window) lookups rather than a sort.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._order = []  # Values in arrival order, to know which one leaves
+        self._start = 0
+        self._sorted = _IndexableSkiplist(window)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def add(self, value):
+        if len(self._sorted) == self.window:
+            self._sorted.remove(self._order[self._start])
+            self._start += 1
+            if self._start >= self.window:  # Drop the consumed prefix now and then, not every sample
+                del self._order[:self._start]
+                self._start = 0
+        self._order.append(value)
+        self._sorted.insert(value)
+
+    def median(self):
+        n = len(self._sorted)
+        return (self._sorted[(n - 1) // 2] + self._sorted[n // 2]) / 2
+
+    def _kth_distance(self, median, k):
+        """
+        k-th smallest |value - median| (from 0). Below the middle the distances
+        grow to the left and above it to the right, so this is the k-th value of
+        two merged sorted lists, found by bisecting how many come from the left.
+        """
+        values = self._sorted
+        middle = len(values) // 2
+        left, right = middle, len(values) - middle
+        low, high = max(0, k + 1 - right), min(k + 1, left)
+        while low < high:
+            i = (low + high) // 2
+            if median - values[middle - 1 - i] < values[middle + k - i] - median:
+                low = i + 1
+            else:
+                high = i
+        j = k + 1 - low
+        candidates = []
+        if low > 0:
+            candidates.append(median - values[middle - low])
+        if j > 0:
+            candidates.append(values[middle + j - 1] - median)
+        return max(candidates)
+
+    def median_mad(self):
+        """
+        Returns (median, MAD) of the window.
+        """
+        n = len(self._sorted)
+        median = self.median()
+        mad = (self._kth_distance(median, (n - 1) // 2) + self._kth_distance(median, n // 2)) / 2
+        return median, mad
+
+
+class HampelFilter:
+    """
+    Streaming outlier check for every channel on its own (Hampel filter). A
+    reading is an outlier when it is further from the median of that
+    channel's last `window` readings than threshold * 1.4826 * MAD, and at
+    least min_deviation away; readings outside low..high always are.
+    action='flag' replaces an outlier by NaN, action='repair' by the median.
+    Readings go into the window even when they are outliers, so a real step
+    is accepted once it fills half the window instead of being rejected forever.
+    rejected counts the outliers of each channel.
+    """
+
+    def __init__(self, channels=1, window=15, threshold=3.0, min_deviation=100.0, min_periods=5,
+                 low=-100.0, high=3000.0, action='flag'):
+        if action not in ('flag', 'repair'):
+            raise ValueError(f"Unknown outlier action: {action}")
+        self.channels = channels
+        self.window = window
+        self.threshold = threshold
+        self.min_deviation = min_deviation
+        self.min_periods = min_periods
+        self.low = low
+        self.high = high
+        self.action = action
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all history and zeroes the counts.
+        """
+        self._windows = [RollingMedian(self.window) for _ in range(self.channels)]
+        self.median = np.full(self.channels, np.nan)
+        self.rejected = np.zeros(self.channels, dtype=np.int64)
+
+    def update(self, values):
+        """
+        Checks one reading per channel. Returns (checked values, boolean array of outliers).
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(self.channels)
+        checked = values.copy()
+        outliers = np.zeros(self.channels, dtype=bool)
+        for i, value in enumerate(values.tolist()):
+            if math.isnan(value):
+                continue  # No reading is not an outlier; the timeout check deals with it
+            window = self._windows[i]
+            in_range = self.low <= value <= self.high
+            if len(window) >= self.min_periods:
+                median, mad = window.median_mad()
+                self.median[i] = median
+                limit = max(self.threshold * _MAD_SCALE * mad, self.min_deviation)
+                outliers[i] = not in_range or abs(value - median) > limit
+            else:
+                outliers[i] = not in_range
+            if in_range:
+                window.add(value)
+            if outliers[i]:
+                checked[i] = self.median[i] if self.action == 'repair' else np.nan
+        self.rejected += outliers
+        return checked, outliers
@@ -0,0 +1,284 @@
+import argparse
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from kiln_loader import load_log
+from kiln_sessions import write_json
+
+
+def phase_kind(mean_rate, hold_rate=30.0):
+    """
+    'ramp' above +hold_rate °F/h, 'cool' below -hold_rate, 'hold' in between.
+    """
+    if mean_rate > hold_rate:
+        return 'ramp'
+    if mean_rate < -hold_rate:
+        return 'cool'
+    return 'hold'
+
+
+def phase_label(segment):
+    """
+    Short description of a segment, e.g. 'ramp at 300 °F/h' or 'hold at 1830 °F'.
+    """
+    if segment['kind'] == 'hold':
+        return f"hold at {segment['end_temperature']:.0f} °F"
+    return f"{segment['kind']} at {segment['mean_rate']:.0f} °F/h"
+
+
+class _Totals:
+    """
+    Running totals of a stretch of samples; rates are weighted by the time they cover.
+    """
+    __slots__ = ('time_ns', 'row', 'temperature', 'hours', 'rate_hours', 'peak')
+
+    def __init__(self, time_ns, row, temperature):
+        self.time_ns = time_ns
+        self.row = row
+        self.temperature = temperature
+        self.hours = 0.0
+        self.rate_hours = 0.0
+        self.peak = temperature
+
+    def copy(self):
+        copy = _Totals(self.time_ns, self.row, self.temperature)
+        copy.hours, copy.rate_hours, copy.peak = self.hours, self.rate_hours, self.peak
+        return copy
+
+
+class PhaseSegmenter:
+    """
+    Splits a firing into ramp / hold / cool segments while it is logged.
+
+    The rate of each sample is compared with the mean rate of the open
+    segment by a two-sided Page-Hinkley test: the departures, less a drift of
+    `drift` °F/h, are summed over time, and when the sum climbs `threshold`
+    above its lowest point the rate has changed. Because the rate is weighted
+    by hours, the sum is in °F: a change is called once the temperature has
+    moved `threshold` °F away from the segment's trend. The segment is split
+    where the sum was lowest, i.e. where the change began.
+
+    Every sample costs a constant amount of work: the totals at the lowest
+    point are kept as the sum goes along, so a split never rescans samples.
+    A split that would leave a segment shorter than min_seconds is dropped.
+    Neighbouring segments of the same kind with mean rates within `drift` are
+    merged, so noise does not chop a hold into pieces, and so is a cool that
+    is slower than the one before it: natural cooling keeps slowing down, so
+    it stays one segment instead of a staircase of ever slower ones.
+    """
+
+    def __init__(self, hold_rate=30.0, drift=25.0, threshold=20.0, min_seconds=300):
+        self.hold_rate = hold_rate
+        self.drift = drift
+        self.threshold = threshold
+        self.min_seconds = min_seconds
+        self.segments = []  # Closed segments, oldest first
+        self.changed = False  # Set whenever segments changes; cleared by save()
+        self._start = None  # Where the open segment began
+        self._open = None  # Totals of the open segment up to the newest sample
+        self._last_ns = None
+        self._last_rate = None  # Mean rate of the last piece closed, before any merge
+
+    def _restart_tests(self):
+        self._up = self._down = 0.0
+        self._up_low = self._down_low = 0.0
+        self._up_split = self._open.copy()
+        self._down_split = self._open.copy()
+        self._up_peak = self._down_peak = self._open.temperature  # Peak since each split point
+
+    def update(self, time_ns, row, temperature, rate):
+        """
+        Adds one sample (store row number, temperature in °F and rate in °F/h).
+        Returns the segment that closed, if any.
+        """
+        if np.isnan(temperature) or np.isnan(rate):
+            return None
+        if self._open is None:
+            self._start = _Totals(time_ns, row, temperature)
+            self._open = _Totals(time_ns, row, temperature)
+            self._last_ns = time_ns
+            self._restart_tests()
+            return None
+
+        hours = (time_ns - self._last_ns) / 3.6e12
+        self._last_ns = time_ns
+        totals = self._open
+        totals.time_ns, totals.row, totals.temperature = time_ns, row, temperature
+        totals.hours += hours
+        totals.rate_hours += rate * hours
+        totals.peak = max(totals.peak, temperature)
+        self._up_peak = max(self._up_peak, temperature)
+        self._down_peak = max(self._down_peak, temperature)
+        if totals.hours <= 0:
+            return None
+        mean = totals.rate_hours / totals.hours
+
+        self._up += (rate - mean - self.drift) * hours
+        if self._up < self._up_low:
+            self._up_low, self._up_split, self._up_peak = self._up, totals.copy(), temperature
+        self._down += (mean - rate - self.drift) * hours
+        if self._down < self._down_low:
+            self._down_low, self._down_split, self._down_peak = self._down, totals.copy(), temperature
+
+        if self._up - self._up_low > self.threshold:
+            return self._split(self._up_split, self._up_peak)
+        if self._down - self._down_low > self.threshold:
+            return self._split(self._down_split, self._down_peak)
+        return None
+
+    def _split(self, split, peak_after):
+        totals = self._open
+        if split.hours * 3600 < self.min_seconds:
+            # Too short to be a phase: start over from here with the whole stretch as one segment
+            self._restart_tests()
+            return None
+
+        closed = self._segment(self._start, split)
+        new = _Totals(split.time_ns, split.row, split.temperature)
+        new.hours = totals.hours - split.hours
+        new.rate_hours = totals.rate_hours - split.rate_hours
+        new.peak = peak_after
+        new.time_ns, new.row, new.temperature = totals.time_ns, totals.row, totals.temperature
+        self._start = _Totals(split.time_ns, split.row, split.temperature)
+        self._open = new
+        self._restart_tests()
+        return self._close(closed)
+
+    def _segment(self, start, totals):
+        mean = totals.rate_hours / totals.hours if totals.hours > 0 else 0.0
+        return {
+            'kind': phase_kind(mean, self.hold_rate),
+            'start_ns': int(start.time_ns),
+            'end_ns': int(totals.time_ns),
+            'start_row': int(start.row),
+            'end_row': int(totals.row),
+            'mean_rate': float(mean),
+            'peak': float(totals.peak),
+            'start_temperature': float(start.temperature),
+            'end_temperature': float(totals.temperature),
+        }
+
+    def _close(self, segment):
+        previous = self.segments[-1] if self.segments else None
+        last_rate, self._last_rate = self._last_rate, segment['mean_rate']
+        if previous is not None and previous['kind'] == segment['kind'] and \
+                (abs(last_rate - segment['mean_rate']) < self.drift or
+                 (segment['kind'] == 'cool' and segment['mean_rate'] > last_rate)):
+            before = previous['end_ns'] - previous['start_ns']
+            after = segment['end_ns'] - segment['start_ns']
+            previous['mean_rate'] = (previous['mean_rate'] * before + segment['mean_rate'] * after) / max(before + after, 1)
+            previous['kind'] = phase_kind(previous['mean_rate'], self.hold_rate)
+            previous['peak'] = max(previous['peak'], segment['peak'])
+            for key in ('end_ns', 'end_row', 'end_temperature'):
+                previous[key] = segment[key]
+            segment = previous
+        else:
+            self.segments.append(segment)
+        self.changed = True
+        logging.info(f"Firing phase: {phase_label(segment)}")
+        return segment
+
+    def finish(self):
+        """
+        Closes the open segment at the end of the firing. Returns it (or what it merged into).
+        """
+        if self._open is None or self._open.hours <= 0:
+            return None
+        segment = self._close(self._segment(self._start, self._open))
+        self._open = None
+        return segment
+
+    def current(self):
+        """
+        Returns the open segment as it stands, or None before the first sample.
+        """
+        if self._open is None:
+            return None
+        return self._segment(self._start, self._open)
+
+    def index(self):
+        """
+        Copies of every segment so far, the open one last.
+        """
+        current = self.current()
+        segments = [dict(segment) for segment in self.segments]
+        return segments + ([current] if current is not None and current['end_ns'] > current['start_ns'] else [])
+
+    def save(self, filename, tz='America/New_York'):
+        """
+        Writes the segment index as JSON (see save_phases).
+        """
+        save_phases(filename, self.index(), tz)
+        self.changed = False
+
+
+def save_phases(filename, segments, tz='America/New_York'):
+    """
+    Writes a segment index (PhaseSegmenter.index()) as JSON, atomically (see kiln_sessions.write_json).
+    """
+    write_json(filename, {'version': 1, 'timezone': tz, 'segments': segments})
+
+
+def phases_frame(segments, tz='America/New_York'):
+    """
+    Segments as a DataFrame, with start and end localized to tz and a readable label per segment.
+    """
+    df = pd.DataFrame.from_records(segments, columns=[
+        'kind', 'start_ns', 'end_ns', 'start_row', 'end_row', 'mean_rate', 'peak', 'start_temperature', 'end_temperature'])
+    df['label'] = [phase_label(segment) for segment in segments]
+    for name in ('start', 'end'):
+        df[name] = pd.to_datetime(df[f'{name}_ns'], unit='ns', utc=True).dt.tz_convert(tz)
+    return df
+
+
+def read_phases(filename, tz=None):
+    """
+    Loads a segment index as a DataFrame (see phases_frame), in tz or by
+    default the zone the logger ran in. start_row/end_row are row numbers in
+    the firing's log, so a segment is df.iloc[start_row:end_row + 1].
+    """
+    with open(filename, encoding='utf-8') as f:
+        index = json.load(f)
+    return phases_frame(index['segments'], tz or index['timezone'])
+
+
+def detect_phases(filename, hold_rate=30.0, drift=25.0, threshold=20.0, min_seconds=300):
+    """
+    Runs the segmenter over a finished log (CSV), using the average temperature
+    and the mean of the sensor rates. Returns the finished PhaseSegmenter.
+    """
+    df = load_log(filename, normalize=True)
+    times = df[df.columns[0]].to_numpy()
+    temperature_columns = [name for name in df.columns if name.startswith('Temperature ')]
+    rate_columns = [name for name in df.columns if name.startswith('Rate of Change ') and ' over ' not in name]
+    temperatures = df['Average Temperature (°F)'].to_numpy() if 'Average Temperature (°F)' in df.columns else \
+        np.nanmean(df[temperature_columns].to_numpy(), axis=1)
+    rates = np.nanmean(df[rate_columns].to_numpy(), axis=1)
+    segmenter = PhaseSegmenter(hold_rate=hold_rate, drift=drift, threshold=threshold, min_seconds=min_seconds)
+    for row, (time_ns, temperature, rate) in enumerate(zip(times.tolist(), temperatures.tolist(), rates.tolist())):
+        segmenter.update(time_ns, row, temperature, rate)
+    segmenter.finish()
+    return segmenter
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Show the ramp / hold / cool segments of a firing.")
+    parser.add_argument('files', nargs='+', help="phase index (.json) files, or CSV logs to segment")
+    parser.add_argument('--save', action='store_true', help="write <log>_phases.json next to each CSV")
+    parser.add_argument('--tz', default='America/New_York')
+    args = parser.parse_args()
+    for path in args.files:
+        if path.endswith('.json'):
+            phases = read_phases(path, args.tz)
+        else:
+            segmenter = detect_phases(path)
+            if args.save:
+                segmenter.save(os.path.splitext(path)[0] + '_phases.json', args.tz)
+            phases = phases_frame(segmenter.index(), args.tz)
+        print(path)
+        print(phases[['start', 'end', 'label', 'peak', 'start_row', 'end_row']].to_string(index=False))
@@ -0,0 +1,192 @@
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class SampleQueue:
+    """
+    Bounded FIFO between the acquisition thread and its consumers.
+    put() never blocks the producer: when the queue is full the oldest
+    sample is thrown away and counted in `dropped`.
+    """
+
+    def __init__(self, maxsize=100):
+        self._queue = queue.Queue(maxsize)
+        self.maxsize = maxsize
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+        self.put_count += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def get(self, timeout=None):
+        """
+        Returns the next item, or None if nothing arrived within timeout.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class AcquisitionThread(threading.Thread):
+    """
+    Reads the sensors on every scheduler tick and pushes
+    (epoch_ns, monotonic_ns, readings) into a SampleQueue. It does nothing
+    else, so slow plotting or disk writes cannot stretch the sample period.
+    clock supplies the time stamps (a replayed file brings its own); when
+    read_sensors raises EOFError the source is finished and stop_event is set.
+    """
+
+    def __init__(self, read_sensors, scheduler, sample_queue, stop_event, clock=None):
+        super().__init__(name='acquisition', daemon=True)
+        self.read_sensors = read_sensors
+        self.scheduler = scheduler
+        self.clock = clock or (lambda: (time.time_ns(), time.monotonic_ns()))
+        self.queue = sample_queue
+        self.stop_event = stop_event
+        self.read_errors = 0
+
+    def run(self):
+        while self.scheduler.wait(self.stop_event):
+            try:
+                # Time-stamp when the read actually starts, not when the tick was due
+                sample_time, sample_monotonic = self.clock()
+                readings = self.read_sensors()
+            except EOFError:
+                logging.info("Sensor source has no more readings.")
+                self.stop_event.set()
+                break
+            except Exception as e:
+                self.read_errors += 1
+                logging.error(f"Error reading temperatures: {e}")
+            else:
+                if readings is not None:  # None means no new conversion yet
+                    self.queue.put((sample_time, sample_monotonic, readings))
+
+
+class Decimator:
+    """
+    Turns a high-rate stream of (epoch_ns, monotonic_ns, readings) samples
+    into one averaged sample per `interval` seconds, for the normal log.
+    Time stamps are averaged as integers, so they stay exact. Each channel
+    averages only its valid readings, so a reading flagged as NaN (e.g. by the
+    outlier filter) leaves the rest of its bucket intact.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.interval_ns = int(interval * 1e9)
+        self._origin = None  # Buckets are whole intervals counted from the first sample
+        self._bucket = None
+        self._count = 0
+        self._time_sums = None
+        self._sums = None
+        self._valid = None
+
+    def add(self, sample):
+        """
+        Adds one raw sample. Returns the averaged sample of the previous bucket
+        when this sample starts a new one, otherwise None.
+        """
+        sample_time, sample_monotonic, readings = sample
+        values = np.array(readings, dtype=np.float64)
+        if self._origin is None:
+            self._origin = sample_monotonic
+        bucket = (sample_monotonic - self._origin) // self.interval_ns
+
+        result = None
+        if self._count and bucket != self._bucket:
+            result = self.flush()
+        if not self._count:
+            self._bucket = bucket
+            self._time_sums = [0, 0]
+            self._sums = np.zeros_like(values)
+            self._valid = np.zeros(len(values), dtype=np.int64)
+        valid = ~np.isnan(values)
+        self._time_sums[0] += sample_time
+        self._time_sums[1] += sample_monotonic
+        self._sums += np.where(valid, values, 0.0)
+        self._valid += valid
+        self._count += 1
+        return result
+
+    def flush(self):
+        """
+        Returns the average of the samples collected so far (or None) and starts a new bucket.
+        """
+        if not self._count:
+            return None
+        epoch_ns, monotonic_ns = (total // self._count for total in self._time_sums)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            readings = tuple(np.where(self._valid > 0, self._sums / self._valid, np.nan).tolist())
+        self._count = 0
+        return epoch_ns, monotonic_ns, readings
+
+
+class ConsumerThread(threading.Thread):
+    """
+    Takes items off a SampleQueue and hands each one to handler.
+    """
+
+    def __init__(self, name, sample_queue, handler, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.queue = sample_queue
+        self.handler = handler
+        self.stop_event = stop_event
+        self.handled = 0
+        self.errors = 0
+
+    def run(self):
+        # Keep draining after stop is requested so queued samples are not lost
+        while not self.stop_event.is_set() or self.queue.qsize():
+            item = self.queue.get(timeout=0.5)
+            if item is None:
+                continue
+            try:
+                self.handler(item)
+                self.handled += 1
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Error in {self.name} consumer: {e}")
+
+
+class PeriodicThread(threading.Thread):
+    """
+    Calls task every `period` seconds until stopped, and once more on the way out.
+    """
+
+    def __init__(self, name, period, task, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.period = period
+        self.task = task
+        self.stop_event = stop_event
+
+    def _run_task(self):
+        try:
+            self.task()
+        except Exception as e:
+            logging.error(f"Error in {self.name} task: {e}")
+
+    def run(self):
+        while not self.stop_event.wait(self.period):
+            self._run_task()
+        self._run_task()
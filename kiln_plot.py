@@ -0,0 +1,157 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.dates import DateFormatter
+
+from kiln_phases import phase_label
+
+# Matplotlib date number of the Unix epoch, so epoch ns can be turned into x values with one multiply-add
+EPOCH_DATENUM = mdates.date2num(np.datetime64('1970-01-01T00:00:00'))
+NS_PER_DAY = 86400e9
+PHASE_COLORS = {'ramp': 'tab:red', 'hold': 'tab:orange', 'cool': 'tab:blue'}
+
+
+class LivePlotter:
+    """
+    Draws the live panels described by plot_configs without clearing the axes.
+    Lines, legends, grids and text boxes are created once. Each tick only
+    the line data and text change, and they are blitted over a cached
+    background. The full figure is only redrawn when an axis limit has to move.
+
+    Each config is a dict with:
+        "columns"      store columns to draw, one line each
+        "labels"       legend label for each line
+        "title", "ylabel"
+        "ylim"         fixed (low, high), or None to follow the data
+        "last_text"    optional format string filled with the newest value of each column
+        "last_text_x"  x position (axes fraction) of that text box
+    """
+
+    def __init__(self, fig, axs, plot_configs, max_points=500, tz='America/New_York', margin=5, message_rows=2):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.configs = plot_configs
+        self.max_points = max_points
+        self.margin = margin
+        self.background = None
+        self.lines = []
+        self.texts = []
+        self.axes = []
+
+        for ax, config in zip(axs, plot_configs):
+            lines = [ax.plot([], [], label=label, animated=True)[0] for label in config["labels"][:len(config["columns"])]]
+            ax.set_title(config["title"])
+            ax.set_ylabel(config["ylabel"])
+            ax.set_ylim(config["ylim"] or (-10, 10))
+            ax.legend(loc='upper left')
+            ax.grid()
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=12))
+            ax.xaxis.set_major_formatter(DateFormatter('%H:%M', tz=tz))  # Only show time (HH:MM)
+            text = None
+            if "last_text" in config:
+                text = ax.text(config.get("last_text_x", 0.45), 0.95, '', transform=ax.transAxes,
+                               fontsize=10, verticalalignment='top', horizontalalignment='right',
+                               bbox=dict(boxstyle='round', facecolor='white', alpha=0.5), animated=True)
+            self.axes.append(ax)
+            self.lines.append(lines)
+            self.texts.append(text)
+
+        # Error messages (e.g. sensor timeouts) go on the first panel
+        self.messages = [self.axes[0].text(0.5, y, '', transform=self.axes[0].transAxes, color='red',
+                                           fontsize=12, ha='center', animated=True)
+                         for y in np.linspace(0.9, 0.9 - 0.1 * (message_rows - 1), message_rows)]
+
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _artists(self):
+        for lines, text in zip(self.lines, self.texts):
+            yield from lines
+            if text is not None:
+                yield text
+        yield from self.messages
+
+    def _on_draw(self, event):
+        # Any full draw (ours, a resize, the toolbar) refreshes the cached background
+        if self.canvas.supports_blit:
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self._artists():
+            self.fig.draw_artist(artist)
+
+    def _fit(self, values, current):
+        """
+        Returns new (low, high) limits if the data has left the current limits or
+        would fit in less than half of them, otherwise None. Leaves headroom so
+        the limits do not have to move again on the next tick.
+        """
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return None
+        low, high = values.min(), values.max()
+        pad = self.margin + (high - low) * 0.1
+        if current[0] <= low and high <= current[1] and current[1] - current[0] <= 2 * (high - low + 2 * pad):
+            return None
+        return low - pad, high + pad
+
+    def update(self, store, messages=()):
+        """
+        Shows the newest max_points samples of store plus any error messages.
+        """
+        if len(store) == 0:
+            return
+
+        x = store.tail('Time', self.max_points) / NS_PER_DAY + EPOCH_DATENUM
+        relayout = False
+
+        x_limits = self.axes[0].get_xlim()
+        if x[-1] > x_limits[1] or x[0] < x_limits[0] or len(x) == 1:
+            span = max(x[-1] - x[0], 60 / 86400)
+            x_limits = (x[0], x[-1] + span * 0.25)
+            relayout = True
+
+        for ax, config, lines, text in zip(self.axes, self.configs, self.lines, self.texts):
+            columns = [store.tail(column, self.max_points) for column in config["columns"]]
+            for line, y in zip(lines, columns):
+                line.set_data(x, y)
+
+            if config["ylim"] is None:
+                limits = self._fit(np.concatenate(columns), ax.get_ylim())
+                if limits is not None:
+                    ax.set_ylim(limits)
+                    relayout = True
+
+            if text is not None:
+                text.set_text(config["last_text"].format(*(y[-1] for y in columns)))
+
+            if relayout:
+                ax.set_xlim(x_limits)
+
+        for artist, message in zip(self.messages, list(messages) + [''] * len(self.messages)):
+            artist.set_text(message)
+
+        if relayout or self.background is None or not self.canvas.supports_blit:
+            self.canvas.draw()  # _on_draw caches the new background and draws the lines
+        else:
+            self.canvas.restore_region(self.background)
+            for artist in self._artists():
+                self.fig.draw_artist(artist)
+            self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+
+    def finish(self):
+        """
+        Makes every artist a normal one again so savefig and plt.show draw them.
+        """
+        for artist in self._artists():
+            artist.set_animated(False)
+
+    def mark_phases(self, segments):
+        """
+        Shades each firing phase (segments from kiln_phases) on every panel and names it on the first.
+        Meant for the final figure: the shading is part of the background, not blitted.
+        """
+        for segment in segments:
+            start, end = (segment[key] / NS_PER_DAY + EPOCH_DATENUM for key in ('start_ns', 'end_ns'))
+            color = PHASE_COLORS.get(segment['kind'], 'tab:gray')
+            for ax in self.axes:
+                ax.axvspan(start, end, color=color, alpha=0.1, linewidth=0)
+            self.axes[0].text((start + end) / 2, 0.03, phase_label(segment), transform=self.axes[0].get_xaxis_transform(),
+                              fontsize=8, ha='center', va='bottom', rotation=90, color=color)
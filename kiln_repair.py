@@ -0,0 +1,120 @@
+import argparse
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from kiln_loader import parse_times
+
+_SUFFIX = '_clean'
+
+
+def _unique_rows(filename, chunk_size):
+    """
+    Reads a log in chunks and returns its distinct samples (first copy of each
+    timestamp) in time order. Memory grows with the number of distinct samples,
+    not with the file size, so a log that is mostly re-appended copies is cheap.
+    """
+    kept = None
+    read = 0
+    for chunk in pd.read_csv(filename, chunksize=chunk_size, dtype={0: str}, float_precision='round_trip'):
+        read += len(chunk)
+        time_column = chunk.columns[0]
+        chunk = chunk.dropna(subset=[time_column])
+        chunk.insert(0, '_time_ns', parse_times(chunk[time_column].to_numpy()))
+        chunk = chunk.drop_duplicates('_time_ns')
+        if kept is not None:
+            chunk = chunk[~chunk['_time_ns'].isin(kept['_time_ns'])]
+            chunk = pd.concat([kept, chunk], ignore_index=True)
+        kept = chunk
+    if kept is None:
+        return None, 0
+    kept = kept.sort_values('_time_ns', kind='stable').drop(columns='_time_ns').reset_index(drop=True)
+    return kept, read
+
+
+def recompute_moving_averages(df, window=20):
+    """
+    Recomputes the smoothed rate columns of a de-duplicated log in place, the
+    way the logger computes them:
+      'Moving Average <rate>' (rev20+)  rolling mean of <rate>, NaN until the window fills
+      'Filtered <rate>' (October)       rolling mean of <rate>, 0 until the window fills
+      'Filtered Average Rate of Change' mean of the filtered sensor rates
+    Returns the names of the columns that were recomputed.
+    """
+    recomputed = []
+    filtered_rates = []
+    for name in df.columns:
+        for prefix, fill in (('Moving Average ', None), ('Filtered ', 0)):
+            source = name[len(prefix):]
+            if name.startswith(prefix) and source in df.columns and not source.startswith('Average '):
+                smoothed = df[source].rolling(window=window).mean()
+                df[name] = smoothed if fill is None else smoothed.fillna(fill)
+                recomputed.append(name)
+                if prefix == 'Filtered ':
+                    filtered_rates.append(name)
+    for name in df.columns:
+        if name.startswith('Filtered Average Rate of Change') and filtered_rates:
+            df[name] = df[filtered_rates].mean(axis=1)
+            recomputed.append(name)
+    return recomputed
+
+
+def repair_csv(filename, output=None, window=20, chunk_size=50000):
+    """
+    Writes a clean copy of a thermocouple log: duplicate timestamps removed,
+    rows in time order, moving averages recomputed. Time strings are copied
+    unchanged. Returns (output file name, rows read, rows written).
+    """
+    if output is None:
+        root, ext = os.path.splitext(filename)
+        output = root + _SUFFIX + ext
+
+    df, read = _unique_rows(filename, chunk_size)
+    if df is None:
+        with open(filename, encoding='utf-8') as f:
+            header = f.readline()
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            f.write(header)
+        return output, 0, 0
+
+    recompute_moving_averages(df, window)
+    df.to_csv(output, index=False)
+    logging.info(f"Repaired {filename}: {read} rows -> {len(df)} rows in {output}")
+    return output, read, len(df)
+
+
+def repair_directory(directory, output_dir=None, window=20, jobs=None, pattern='thermocouple_data_*.csv'):
+    """
+    Repairs every matching log in a directory, one file per worker process.
+    Files already ending in _clean.csv are skipped. Returns the repair_csv results.
+    """
+    filenames = [name for name in sorted(glob.glob(os.path.join(directory, pattern)))
+                 if not os.path.splitext(name)[0].endswith(_SUFFIX)]
+    outputs = [None if output_dir is None else os.path.join(output_dir, os.path.basename(name))
+               for name in filenames]
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(repair_csv, filenames, outputs, [window] * len(filenames)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Remove duplicate rows from thermocouple CSV logs.")
+    parser.add_argument('paths', nargs='+', help="CSV files, or directories to repair every log in")
+    parser.add_argument('--output-dir', help="write clean files here instead of <name>_clean.csv")
+    parser.add_argument('--window', type=int, default=20, help="moving average window in samples")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes for directories")
+    args = parser.parse_args()
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for path in args.paths:
+        if os.path.isdir(path):
+            repair_directory(path, args.output_dir, args.window, args.jobs)
+        else:
+            output = None if args.output_dir is None else os.path.join(args.output_dir, os.path.basename(path))
+            repair_csv(path, output, args.window)
@@ -0,0 +1,209 @@
+import numpy as np
+
+from kiln_store import SampleStore
+
+STATS = ('min', 'max', 'mean', 'first', 'last')
+
+
+def rollup_column(column, stat):
+    """
+    Name of the rollup column holding `stat` of `column`, e.g. 'Average Temperature (°F) [max]'.
+    """
+    return f'{column} [{stat}]'
+
+
+class RollupTier:
+    """
+    Downsampled copy of the log: one row per bucket_seconds bucket with the
+    min, max, mean, first and last of every column. Buckets line up with the
+    wall clock (minutes, ten minutes...). Each sample updates the open bucket
+    in O(columns); when a sample falls in a later bucket, the open one is
+    appended to `store` as a finished row.
+    """
+
+    def __init__(self, bucket_seconds, columns, time_column='Time'):
+        self.bucket_seconds = bucket_seconds
+        self.bucket_ns = int(bucket_seconds * 1e9)
+        self.columns = [name for name in columns if name != time_column]
+        self.time_column = time_column
+        self.store = SampleStore([time_column, 'Count',
+                                  *(rollup_column(c, s) for c in self.columns for s in STATS)])
+        self._bucket = None
+        self._reset()
+
+    def _reset(self):
+        shape = len(self.columns)
+        self._count = np.zeros(shape, dtype=np.int64)
+        self._samples = 0
+        self._min = np.full(shape, np.inf)
+        self._max = np.full(shape, -np.inf)
+        self._sum = np.zeros(shape)
+        self._first = np.full(shape, np.nan)
+        self._last = np.full(shape, np.nan)
+
+    def open_row(self):
+        """
+        Returns the row (in store column order) for the bucket still being filled, or None.
+        """
+        if self._bucket is None or self._samples == 0:
+            return None
+        has = self._count > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats = np.stack([np.where(has, self._min, np.nan), np.where(has, self._max, np.nan),
+                              np.where(has, self._sum / self._count, np.nan), self._first, self._last], axis=1)
+        return [self._bucket * self.bucket_ns, self._samples, *stats.ravel().tolist()]
+
+    def add(self, time_ns, values):
+        """
+        Adds one sample (values in self.columns order).
+        """
+        bucket = time_ns // self.bucket_ns
+        if self._bucket is not None and bucket != self._bucket:
+            row = self.open_row()
+            if row is not None:
+                self.store.append(row)
+            self._reset()
+        self._bucket = bucket
+
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        self._samples += 1
+        self._count += valid
+        self._min = np.where(valid, np.fmin(self._min, values), self._min)
+        self._max = np.where(valid, np.fmax(self._max, values), self._max)
+        self._sum += np.where(valid, values, 0.0)
+        self._first = np.where(np.isnan(self._first) & valid, values, self._first)
+        self._last = np.where(valid, values, self._last)
+
+
+class RollupSet:
+    """
+    The rollup tiers kept alongside the raw samples (1 min and 10 min by default).
+    select() picks the finest tier that covers a time range in no more than the
+    requested number of points, so a plot or query over a long firing never
+    has to scan the raw data.
+    """
+
+    def __init__(self, columns, tiers=(60, 600), time_column='Time'):
+        self.columns = [name for name in columns if name != time_column]
+        self.time_column = time_column
+        self.tiers = [RollupTier(seconds, columns, time_column) for seconds in sorted(tiers)]
+
+    def add(self, row):
+        """
+        Adds one store row (time first, then the other columns in order).
+        """
+        for tier in self.tiers:
+            tier.add(int(row[0]), row[1:])
+
+    def select(self, span_seconds, max_points, raw_rows=None):
+        """
+        Returns the finest tier with at most max_points buckets over span_seconds,
+        or None when the raw_rows raw samples already fit in max_points or no
+        tier is coarse enough (the caller then thins the raw samples, see raw_step).
+        """
+        if raw_rows is not None and raw_rows <= max_points:
+            return None
+        for tier in self.tiers:
+            if span_seconds / tier.bucket_seconds <= max(max_points, 1):
+                return tier
+        return None
+
+    @staticmethod
+    def raw_step(rows, max_points):
+        """
+        Stride that thins rows raw samples to at most max_points.
+        """
+        return max(-(-rows // max(max_points, 1)), 1)
+
+    def query(self, raw_store, start_ns=None, end_ns=None, max_points=500, tz='America/New_York'):
+        """
+        Returns a DataFrame for a time range in at most about max_points rows:
+        the raw samples when they fit, otherwise the rollup rows (Time, Count
+        and min/max/mean/first/last of every column) of the finest tier that
+        fits, or every n-th raw sample when even the coarsest tier has too
+        many buckets. The bucket still being filled is left out.
+        """
+        times = raw_store.column(self.time_column)
+        if len(times) == 0:
+            return raw_store.to_dataframe(tz=tz)
+        start_ns = times[0] if start_ns is None else start_ns
+        end_ns = times[-1] if end_ns is None else end_ns
+        raw_start = np.searchsorted(times, start_ns, side='left')
+        raw_stop = np.searchsorted(times, end_ns, side='right')
+        tier = self.select((end_ns - start_ns) / 1e9, max_points, raw_rows=raw_stop - raw_start)
+        store = raw_store if tier is None else tier.store
+        store_times = store.column(self.time_column)
+        start = np.searchsorted(store_times, start_ns, side='left')
+        stop = np.searchsorted(store_times, end_ns, side='right')
+        first_row = store.total_rows - len(store)
+        df = store.to_dataframe(first_row + start, first_row + stop, tz=tz)
+        if tier is None:
+            df = df.iloc[::self.raw_step(len(df), max_points)].reset_index(drop=True)
+        return df
+
+    def view(self, raw_store, max_points=500, stat='mean'):
+        """
+        Returns a FiringView that shows the whole firing in at most about max_points points.
+        """
+        return FiringView(self, raw_store, max_points, stat)
+
+
+class FiringView:
+    """
+    Read-only stand-in for a SampleStore (len, tail, last) that covers the whole
+    firing: the raw samples if they fit in max_points, else the finest rollup
+    tier that does, else every n-th raw sample. Each bucket is shown at its
+    middle with the chosen statistic, and the bucket still being filled is
+    included so the view reaches the newest sample.
+    tail() always returns the whole view, whatever n is, so a plotter that
+    keeps its newest max_points cannot cut off the start of the firing.
+    """
+
+    def __init__(self, rollups, raw_store, max_points, stat='mean'):
+        self.rollups = rollups
+        self.raw_store = raw_store
+        self.time_column = rollups.time_column
+        self.stat = stat
+        span = 0
+        if len(raw_store):
+            span = (raw_store.last(self.time_column) - raw_store.column(self.time_column)[0]) / 1e9
+        self.tier = rollups.select(span, max_points, raw_rows=len(raw_store))
+        self.step = rollups.raw_step(len(raw_store), max_points) if self.tier is None else 1
+        self._cache = {}
+
+    def _raw_column(self, name):
+        column = self.raw_store.column(name)
+        if self.step == 1:
+            return column
+        return column[(len(column) - 1) % self.step::self.step]  # Counted back from the newest sample, so it stays in
+
+    def _tier_column(self, name):
+        if name not in self._cache:
+            tier = self.tier
+            open_row = tier.open_row()
+            if name == self.time_column:
+                done = tier.store.column(self.time_column) + tier.bucket_ns // 2
+                extra = [] if open_row is None else [open_row[0] + tier.bucket_ns // 2]
+            else:
+                column = rollup_column(name, self.stat)
+                done = tier.store.column(column)
+                extra = [] if open_row is None else [open_row[tier.store.columns.index(column)]]
+            self._cache[name] = np.concatenate([done, np.asarray(extra, dtype=done.dtype)])
+        return self._cache[name]
+
+    def _column(self, name):
+        if self.tier is None:
+            return self._raw_column(name)
+        return self._tier_column(name)
+
+    def __len__(self):
+        return len(self._column(self.time_column))
+
+    def tail(self, name, n):
+        return self._column(name)
+
+    def last(self, name):
+        if self.tier is None:
+            return self.raw_store.last(name)
+        return self._tier_column(name)[-1]
@@ -0,0 +1,90 @@
+import math
+import time
+
+
+class SampleScheduler:
+    """
+    Fires on absolute deadlines start + k * interval taken from time.monotonic(),
+    so the time spent reading the sensors does not add to the period and the
+    schedule never drifts.
+
+    When a tick is late by one or more whole intervals, policy decides:
+        'skip'      drop the missed deadlines and carry on with the next one
+        'catch_up'  fire the missed deadlines back to back, at most max_catch_up
+                    of them, then skip the rest
+    Lateness of every tick (jitter) is kept as running statistics.
+    """
+
+    def __init__(self, interval, policy='skip', max_catch_up=3, clock=time.monotonic):
+        if policy not in ('skip', 'catch_up'):
+            raise ValueError(f"Unknown overrun policy: {policy}")
+        self.interval = interval
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.start = None
+        self.tick = 0
+        self.skipped = 0
+        # Running jitter statistics (Welford), in seconds
+        self.jitter_count = 0
+        self.jitter_mean = 0.0
+        self._jitter_m2 = 0.0
+        self.jitter_max = 0.0
+
+    def deadline(self):
+        """
+        Returns the monotonic time of the next tick.
+        """
+        return self.start + self.tick * self.interval
+
+    def _record(self, lateness):
+        self.jitter_count += 1
+        delta = lateness - self.jitter_mean
+        self.jitter_mean += delta / self.jitter_count
+        self._jitter_m2 += delta * (lateness - self.jitter_mean)
+        self.jitter_max = max(self.jitter_max, lateness)
+
+    def wait(self, stop_event=None):
+        """
+        Blocks until the next deadline. Returns False if stop_event was set while waiting.
+        The first call returns straight away and starts the schedule.
+        """
+        now = self.clock()
+        if self.start is None:
+            self.start = now
+        else:
+            self.tick += 1
+            missed = math.floor((now - self.deadline()) / self.interval)
+            if missed >= 1:
+                # Overran by whole intervals: drop the deadlines the policy does not catch up on.
+                # The ones kept fire back to back on the next calls, as they are already due.
+                skip = missed if self.policy == 'skip' else max(missed - self.max_catch_up, 0)
+                self.tick += skip
+                self.skipped += skip
+
+            remaining = self.deadline() - now
+            if remaining > 0:
+                if stop_event is not None:
+                    if stop_event.wait(remaining):
+                        return False
+                else:
+                    time.sleep(remaining)
+                # Event.wait can return a touch early; never fire before the deadline
+                while self.clock() < self.deadline():
+                    time.sleep(0.001)
+
+        self._record(self.clock() - self.deadline())
+        return stop_event is None or not stop_event.is_set()
+
+    def stats(self):
+        """
+        Returns tick and jitter statistics, jitter in seconds.
+        """
+        std = math.sqrt(self._jitter_m2 / (self.jitter_count - 1)) if self.jitter_count > 1 else 0.0
+        return {
+            'ticks': self.jitter_count,
+            'skipped': self.skipped,
+            'jitter_mean': self.jitter_mean,
+            'jitter_std': std,
+            'jitter_max': self.jitter_max,
+        }
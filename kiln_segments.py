@@ -0,0 +1,128 @@
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed for the Parquet firing store
+    pa = None
+    pq = None
+
+from kiln_loader import parse_times
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The Parquet firing store needs pyarrow (pip install pyarrow)")
+
+
+def _table_from_columns(columns, time_column='Time'):
+    """
+    Builds an Arrow table from {name: array}, with time as a UTC timestamp column.
+    """
+    fields = []
+    arrays = []
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if name == time_column:
+            arrays.append(pa.array(values.astype('datetime64[ns]'), type=pa.timestamp('ns', tz='UTC')))
+        else:
+            arrays.append(pa.array(values.astype(np.float64), type=pa.float64(), from_pandas=True))
+        fields.append(pa.field(name, arrays[-1].type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_firing(columns, filename, row_group_size=1800, compression=None, time_column='Time'):
+    """
+    Writes one firing as a Parquet file split into row groups of row_group_size
+    samples (5 hours at 10 s by default). Every column is compressed on its own,
+    and each row group keeps min/max statistics, so a reader that wants one
+    column or one time range only reads the bytes it needs.
+
+    columns is {name: array} (e.g. SampleStore.rows()) with time in epoch ns.
+    compression is a codec name or a {column: codec} dict; by default time is
+    zstd and the floats are byte-stream-split then zstd, which suits slowly
+    changing temperatures.
+    """
+    _require_pyarrow()
+    table = _table_from_columns(columns, time_column)
+    float_columns = [name for name in columns if name != time_column]
+    if compression is None:
+        compression = {name: 'zstd' for name in columns}
+    pq.write_table(table, filename, row_group_size=row_group_size, compression=compression,
+                   use_dictionary=False, use_byte_stream_split=float_columns, write_statistics=True)
+    logging.info(f"Wrote firing segment {filename} ({table.num_rows} rows)")
+    return filename
+
+
+def read_firing(filename, columns=None, start=None, end=None, tz='America/New_York', time_column='Time'):
+    """
+    Loads a firing written by write_firing as a DataFrame like the CSV logs.
+    columns limits which columns are read (time is always included), and
+    start/end (anything pd.Timestamp accepts; naive values are taken as tz)
+    limit the time range. Row groups outside the range are skipped using their
+    statistics, without being read.
+    """
+    _require_pyarrow()
+    if columns is not None:
+        columns = [time_column] + [name for name in columns if name != time_column]
+
+    filters = []
+    for op, bound in (('>=', start), ('<=', end)):
+        if bound is not None:
+            bound = pd.Timestamp(bound)
+            if bound.tzinfo is None:
+                bound = bound.tz_localize(tz)
+            filters.append((time_column, op, bound.tz_convert('UTC')))
+
+    table = pq.read_table(filename, columns=columns, filters=filters or None)
+    df = table.to_pandas()
+    df[time_column] = df[time_column].dt.tz_convert(tz)
+    return df
+
+
+def firing_statistics(filename):
+    """
+    Returns {column: (min, max)} for the whole firing from the row group
+    statistics alone, without reading any data pages.
+    """
+    _require_pyarrow()
+    metadata = pq.ParquetFile(filename).metadata
+    result = {}
+    for group in range(metadata.num_row_groups):
+        row_group = metadata.row_group(group)
+        for i in range(row_group.num_columns):
+            column = row_group.column(i)
+            stats = column.statistics
+            if stats is None or not stats.has_min_max:
+                continue
+            low, high = result.get(column.path_in_schema, (stats.min, stats.max))
+            result[column.path_in_schema] = (min(low, stats.min), max(high, stats.max))
+    return result
+
+
+def convert_csv(csv_filename, parquet_filename=None, **kwargs):
+    """
+    Writes an existing thermocouple_data_*.csv as a Parquet firing file.
+    """
+    if parquet_filename is None:
+        parquet_filename = os.path.splitext(csv_filename)[0] + '.parquet'
+    df = pd.read_csv(csv_filename)
+    time_column = df.columns[0]
+    columns = {name: df[name].to_numpy() for name in df.columns}
+    columns[time_column] = parse_times(columns[time_column])
+    return write_firing(columns, parquet_filename, time_column=time_column, **kwargs)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert thermocouple CSV logs to Parquet firing files.")
+    parser.add_argument('csv_files', nargs='+')
+    parser.add_argument('--row-group-size', type=int, default=1800)
+    args = parser.parse_args()
+    for csv_file in args.csv_files:
+        convert_csv(csv_file, row_group_size=args.row_group_size)
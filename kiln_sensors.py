@@ -0,0 +1,262 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from kiln_loader import parse_times
+
+
+class ConcurrentReader:
+    """
+    Reads several adafruit_max31856.MAX31856 chips on a shared SPI bus in one go.
+    sensor.temperature starts a one-shot conversion and waits for it (~160 ms),
+    so reading chips one after another costs one conversion per chip and skews
+    the channels in time. Here every chip is told to convert first, and the
+    results are collected afterwards, so a read takes about one conversion
+    time however many chips there are.
+    """
+
+    def __init__(self, sensors, timeout=1.0, poll_interval=0.01):
+        self.sensors = list(sensors)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.last_read_seconds = None  # How long the last read() took
+
+    def read(self):
+        """
+        Returns the temperature of every chip in °C, in the order given.
+        Raises TimeoutError if a chip does not finish its conversion within timeout.
+        """
+        start = time.monotonic()
+        for sensor in self.sensors:
+            sensor.initiate_one_shot_measurement()
+
+        pending = list(range(len(self.sensors)))
+        while True:
+            pending = [i for i in pending if self.sensors[i].oneshot_pending]
+            if not pending:
+                break
+            if time.monotonic() - start > self.timeout:
+                raise TimeoutError(f"Sensor {', '.join(str(i + 1) for i in pending)} did not finish converting")
+            time.sleep(self.poll_interval)
+
+        temperatures = [sensor.unpack_temperature() for sensor in self.sensors]
+        self.last_read_seconds = time.monotonic() - start
+        return temperatures
+
+
+# MAX31856 configuration register 0 and its mode bits (datasheet table 6)
+_CR0_REG = 0x00
+_CR0_AUTOCONVERT = 0x80
+_CR0_1SHOT = 0x40
+
+
+class ContinuousReader:
+    """
+    Runs MAX31856 chips in automatic conversion mode, where each chip converts
+    on its own about every 100 ms and read() just fetches the newest result
+    without waiting. The driver has no public switch for this mode, so the CMODE
+    bit is set through its register helpers.
+
+    If the chips' DRDY pins are wired, pass them as digitalio inputs and read()
+    returns None until every chip has a fresh conversion. Without them, pace
+    the reads at the conversion period instead.
+    """
+
+    def __init__(self, sensors, drdy_pins=None):
+        self.sensors = list(sensors)
+        self.drdy_pins = list(drdy_pins) if drdy_pins else None
+        self.running = False
+
+    def _set_mode(self, sensor, auto):
+        cr0 = sensor._read_register(_CR0_REG, 1)[0]
+        if auto:
+            cr0 = (cr0 | _CR0_AUTOCONVERT) & ~_CR0_1SHOT
+        else:
+            cr0 &= ~_CR0_AUTOCONVERT
+        sensor._write_u8(_CR0_REG, cr0)
+
+    def start(self):
+        """
+        Switches every chip to automatic conversion.
+        """
+        for sensor in self.sensors:
+            self._set_mode(sensor, True)
+        self.running = True
+
+    def stop(self):
+        """
+        Puts every chip back into normally-off mode so one-shot reads work again.
+        """
+        for sensor in self.sensors:
+            self._set_mode(sensor, False)
+        self.running = False
+
+    def ready(self):
+        """
+        True when every chip has a conversion that has not been read yet (DRDY is active low).
+        """
+        if self.drdy_pins is None:
+            return True
+        return not any(pin.value for pin in self.drdy_pins)
+
+    def read(self):
+        """
+        Returns the latest temperature of every chip in °C, or None if DRDY says
+        there is nothing new yet. Never waits for a conversion.
+        """
+        if not self.running:
+            self.start()
+        if not self.ready():
+            return None
+        return [sensor.unpack_temperature() for sensor in self.sensors]
+
+
+class SensorBackend:
+    """
+    Where thermocouple readings come from. read() returns one temperature per
+    channel in °C, or None when there is nothing new yet, and raises on a
+    failed read. clock() gives the (epoch ns, monotonic ns) time stamp for
+    the reading about to be taken, as ints. read() raises EOFError once a finite source
+    (a replayed file) has run out.
+    """
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def clock(self):
+        return time.time_ns(), time.monotonic_ns()
+
+    def read(self):
+        raise NotImplementedError
+
+
+class MAX31856Backend(SensorBackend):
+    """
+    The real MAX31856 boards on the Pi's SPI bus, one per chip-select pin
+    name (e.g. "D5"). mode is 'one_shot' (ConcurrentReader) or 'continuous'
+    (ContinuousReader). The Blinka modules are only imported here, so the
+    rest of the logger can run on machines without them.
+    """
+
+    def __init__(self, cs_pins, mode='one_shot'):
+        import board
+        import busio
+        import digitalio
+        import adafruit_max31856
+
+        spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+        self.sensors = []
+        for cs_pin in cs_pins:
+            cs = digitalio.DigitalInOut(getattr(board, cs_pin))  # Chip select for this sensor
+            cs.direction = digitalio.Direction.OUTPUT
+            self.sensors.append(adafruit_max31856.MAX31856(spi, cs))
+        self.mode = mode
+        self.reader = ContinuousReader(self.sensors) if mode == 'continuous' else ConcurrentReader(self.sensors)
+
+    def start(self):
+        if self.mode == 'continuous':
+            self.reader.start()
+
+    def stop(self):
+        if self.mode == 'continuous':
+            self.reader.stop()
+
+    def read(self):
+        return self.reader.read()
+
+
+class ReplayBackend(SensorBackend):
+    """
+    Plays back a recorded thermocouple_data_*.csv, one row per read(), with the
+    recorded time stamps, so the whole pipeline can be run and profiled off the Pi.
+    Rows repeated by the old whole-file re-append are skipped. Schedule the
+    reads at interval / speed to replay at speed times real time.
+    """
+
+    def __init__(self, filename, temperature_columns):
+        df = pd.read_csv(filename, usecols=['Time', *temperature_columns])
+        df = df.drop_duplicates(subset='Time')
+        self.epoch = parse_times(df['Time'].to_numpy())
+        # Recorded values are in °F; backends return °C like the chips
+        self.temperatures = (df[list(temperature_columns)].to_numpy(dtype=float) - 32) * 5 / 9
+        self.position = 0
+
+    def __len__(self):
+        return len(self.epoch)
+
+    def clock(self):
+        if self.position >= len(self.epoch):
+            raise EOFError("End of replay file")
+        sample_time = int(self.epoch[self.position])
+        return sample_time, sample_time - int(self.epoch[0])
+
+    def read(self):
+        if self.position >= len(self.epoch):
+            raise EOFError("End of replay file")
+        readings = self.temperatures[self.position].tolist()
+        self.position += 1
+        return readings
+
+
+class SyntheticBackend(SensorBackend):
+    """
+    Generates a kiln firing for benchmarks and tests: a ramp at ramp_rate (°C/h)
+    from ambient up to peak, a hold, then natural cooling. Readings get Gaussian
+    noise and are quantized to the MAX31856's 1/128 °C steps. Faults can be
+    injected: spike_rate is the chance per channel per read of a wild value, and
+    timeout_rate is the chance that a read hangs for timeout_seconds and raises
+    TimeoutError. Simulated time runs `speed` times faster than real time.
+    """
+
+    def __init__(self, channels, ambient=20.0, peak=1000.0, ramp_rate=150.0, hold_hours=0.5,
+                 cooling_hours=3.0, noise=0.05, channel_offsets=None, spike_rate=0.0,
+                 timeout_rate=0.0, timeout_seconds=1.0, speed=1.0, seed=None):
+        self.channels = channels
+        self.ambient = ambient
+        self.peak = peak
+        self.ramp_rate = ramp_rate
+        self.hold_hours = hold_hours
+        self.cooling_hours = cooling_hours
+        self.noise = noise
+        self.offsets = np.asarray(channel_offsets if channel_offsets is not None else np.linspace(0, 5, channels))
+        self.spike_rate = spike_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.speed = speed
+        self.rng = np.random.default_rng(seed)
+        self.start_epoch = time.time_ns()
+        self.start_monotonic = time.monotonic_ns()
+        self.spikes = 0
+        self.timeouts = 0
+
+    def clock(self):
+        elapsed = int((time.monotonic_ns() - self.start_monotonic) * self.speed)
+        return self.start_epoch + elapsed, elapsed
+
+    def profile(self, hours):
+        """
+        Returns the undisturbed kiln temperature (°C) after `hours` of firing.
+        """
+        ramp_hours = (self.peak - self.ambient) / self.ramp_rate
+        if hours < ramp_hours:
+            return self.ambient + self.ramp_rate * hours
+        if hours < ramp_hours + self.hold_hours:
+            return self.peak
+        cooling = hours - ramp_hours - self.hold_hours
+        return self.ambient + (self.peak - self.ambient) * np.exp(-cooling / self.cooling_hours)
+
+    def read(self):
+        if self.rng.random() < self.timeout_rate:
+            self.timeouts += 1
+            time.sleep(self.timeout_seconds / self.speed)
+            raise TimeoutError("Simulated sensor timeout")
+        _, elapsed = self.clock()
+        temperatures = self.profile(elapsed / 3.6e12) + self.offsets + self.rng.normal(0, self.noise, self.channels)
+        spikes = self.rng.random(self.channels) < self.spike_rate
+        self.spikes += int(spikes.sum())
+        temperatures[spikes] += self.rng.choice([-1, 1], spikes.sum()) * 1000
+        return (np.round(temperatures * 128) / 128).tolist()
@@ -0,0 +1,343 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from kiln_csv import truncate_torn_line
+from kiln_loader import load_log
+
+MANIFEST = 'manifest.json'
+
+
+def _segment_name(index):
+    return f'segment_{index:04d}.csv'
+
+
+def write_json(path, data):
+    """
+    Writes data as JSON through a temporary file, so a reader (or a power cut)
+    sees the old or the new file, never half of one.
+    """
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(temporary, path)
+
+
+class FiringSession:
+    """
+    One firing as a directory root/session_id/ of CSV segments plus a
+    manifest.json. A new segment is started once the open one holds
+    segment_seconds of data, segment_rows rows or segment_bytes bytes
+    (whichever limits are set). For every segment the manifest records the
+    time range (epoch ns), row count, peak of each peak_columns column and a
+    SHA-256 of the file, so a lookup opens only the segments it needs.
+
+    Like the other writers, flush(store) appends only rows not written yet,
+    and with fsync=True forces them onto the disk. The directory is created
+    by the first flush that has rows, so an aborted start leaves nothing
+    behind. export_csv() writes the firing as one flat CSV at the end.
+    """
+
+    def __init__(self, root, session_id, columns, peak_columns=(), segment_seconds=3600, segment_rows=None,
+                 segment_bytes=None, tz='America/New_York', time_column='Time', fsync=False):
+        self.directory = os.path.join(root, session_id)
+        self.session_id = session_id
+        self.columns = list(columns)
+        self.peak_columns = list(peak_columns)
+        self.segment_seconds = segment_seconds
+        self.segment_rows = segment_rows
+        self.segment_bytes = segment_bytes
+        self.tz = tz
+        self.time_column = time_column
+        self.fsync = fsync
+        self.rows_written = 0
+        self.segments = []
+        self._hash = None
+
+    @classmethod
+    def resume(cls, root, session_id, columns, tz='America/New_York', time_column='Time', **settings):
+        """
+        Reopens a session the logger did not close, so rows it never wrote (e.g.
+        from a journal) can be appended. The segments are rescanned from disk
+        rather than taken from the manifest, which can be a flush behind, and a
+        torn last line is cut off. What the manifest recorded wins over the arguments.
+        """
+        try:
+            manifest = read_manifest(root, session_id)
+        except (OSError, ValueError):
+            manifest = {}
+        settings.update(manifest.get('settings', {}))
+        session = cls(root, session_id, manifest.get('columns', columns), tz=manifest.get('timezone', tz),
+                      time_column=manifest.get('time_column', time_column), **settings)
+        for path in sorted(glob.glob(os.path.join(session.directory, 'segment_*.csv'))):
+            data = truncate_torn_line(path)
+            if data.count(b'\n') < 2:
+                os.remove(path)  # Died before the segment's first row
+                continue
+            frame = load_log(path, cache=False)
+            times = frame[session.time_column].to_numpy()
+            segment = {'file': os.path.basename(path), 'first_ns': int(times[0]), 'last_ns': int(times[-1]),
+                       'rows': len(times), 'bytes': len(data), 'peaks': {}, 'sha256': None}
+            session._update_peaks(segment, frame)
+            session._hash = hashlib.sha256(data)
+            segment['sha256'] = session._hash.hexdigest()
+            session.segments.append(segment)
+            session.rows_written += len(times)
+        return session
+
+    def _write_manifest(self, closed):
+        write_json(os.path.join(self.directory, MANIFEST), {
+            'version': 1,
+            'session_id': self.session_id,
+            'time_column': self.time_column,
+            'columns': self.columns,
+            'timezone': self.tz,
+            'rows': sum(segment['rows'] for segment in self.segments),
+            'closed': closed,
+            'settings': {'peak_columns': self.peak_columns, 'segment_seconds': self.segment_seconds,
+                         'segment_rows': self.segment_rows, 'segment_bytes': self.segment_bytes},
+            'segments': self.segments,
+        })
+
+    def _update_peaks(self, segment, columns):
+        for name in self.peak_columns:
+            values = np.asarray(columns[name])
+            if np.any(~np.isnan(values)):
+                peak = float(np.nanmax(values))
+                segment['peaks'][name] = max(peak, segment['peaks'].get(name, peak))
+
+    def _full(self, segment):
+        if self.segment_rows is not None and segment['rows'] >= self.segment_rows:
+            return True
+        if self.segment_bytes is not None and segment['bytes'] >= self.segment_bytes:
+            return True
+        return self.segment_seconds is not None and \
+            segment['last_ns'] - segment['first_ns'] >= self.segment_seconds * 1e9
+
+    def _new_segment(self, first_ns):
+        os.makedirs(self.directory, exist_ok=True)
+        segment = {'file': _segment_name(len(self.segments)), 'first_ns': first_ns, 'last_ns': first_ns,
+                   'rows': 0, 'bytes': 0, 'peaks': {}, 'sha256': None}
+        header = (','.join(self.columns) + '\n').encode('utf-8')
+        with open(os.path.join(self.directory, segment['file']), 'wb') as f:
+            f.write(header)
+        self._hash = hashlib.sha256(header)
+        segment['bytes'] = len(header)
+        segment['sha256'] = self._hash.hexdigest()
+        self.segments.append(segment)
+        return segment
+
+    def _rows_left(self, segment, times):
+        """
+        Returns how many of the new rows (with times `times`) still belong in segment.
+        """
+        count = len(times)
+        if self.segment_rows is not None:
+            count = min(count, self.segment_rows - segment['rows'])
+        if self.segment_seconds is not None:
+            limit = segment['first_ns'] + self.segment_seconds * 1e9
+            count = min(count, int(np.searchsorted(times, limit, side='left')))
+        return max(count, 0)
+
+    def flush(self, store):
+        """
+        Appends the rows of a SampleStore that are not on disk yet, rotating
+        segments as needed, and rewrites the manifest. Returns the number written.
+        """
+        start = self.rows_written
+        stop = store.total_rows
+        if stop <= start:
+            return 0
+
+        times = store.rows(start, stop)[self.time_column]
+        position = start
+        while position < stop:
+            segment = self.segments[-1] if self.segments else None
+            if segment is None or self._full(segment):
+                segment = self._new_segment(int(times[position - start]))
+            count = self._rows_left(segment, times[position - start:])
+            if count == 0:
+                if segment['rows'] == 0:
+                    count = 1  # A limit smaller than one row still has to make progress
+                else:
+                    segment = self._new_segment(int(times[position - start]))
+                    continue
+
+            data = store.to_dataframe(position, position + count, tz=self.tz).to_csv(header=False, index=False)
+            data = data.encode('utf-8')
+            with open(os.path.join(self.directory, segment['file']), 'ab') as f:
+                f.write(data)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._hash.update(data)
+
+            columns = store.rows(position, position + count)
+            segment['last_ns'] = int(columns[self.time_column][-1])
+            segment['rows'] += count
+            segment['bytes'] += len(data)
+            segment['sha256'] = self._hash.hexdigest()
+            self._update_peaks(segment, columns)
+            position += count
+            self.rows_written = position
+
+        self._write_manifest(closed=False)
+        return stop - start
+
+    def close(self):
+        """
+        Marks the session finished in the manifest (if it has any samples).
+        """
+        if self.segments:
+            self._write_manifest(closed=True)
+
+    def export_csv(self, filename):
+        """
+        Writes the whole session as one flat CSV, the way the logger used to
+        write it, by copying the segments after a single header line. The file
+        is replaced atomically. Returns the number of rows, 0 (and no file) if
+        the session is empty.
+        """
+        if not self.segments:
+            return 0
+        temporary = filename + '.tmp'
+        with open(temporary, 'wb') as out:
+            out.write((','.join(self.columns) + '\n').encode('utf-8'))
+            for segment in self.segments:
+                with open(os.path.join(self.directory, segment['file']), 'rb') as f:
+                    f.readline()  # Every segment has its own header
+                    shutil.copyfileobj(f, out)
+            if self.fsync:
+                out.flush()
+                os.fsync(out.fileno())
+        os.replace(temporary, filename)
+        return self.rows_written
+
+
+def read_manifest(root, session_id):
+    with open(os.path.join(root, session_id, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def list_sessions(root='firings'):
+    """
+    Returns a DataFrame with one row per session: rows, time range, peaks and segment count.
+    """
+    records = []
+    for session_id in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        try:
+            manifest = read_manifest(root, session_id)
+        except (OSError, ValueError):
+            continue
+        segments = manifest['segments']
+        peaks = {}
+        for segment in segments:
+            for name, peak in segment['peaks'].items():
+                peaks[name] = max(peak, peaks.get(name, peak))
+        records.append({'session_id': session_id, 'rows': manifest['rows'], 'segments': len(segments),
+                        'first_ns': segments[0]['first_ns'] if segments else None,
+                        'last_ns': segments[-1]['last_ns'] if segments else None,
+                        'closed': manifest['closed'], **{f'peak {name}': peak for name, peak in peaks.items()}})
+    return pd.DataFrame.from_records(records)
+
+
+def read_session(root, session_id, start_ns=None, end_ns=None, last_seconds=None, columns=None, tz=None):
+    """
+    Reads part of a session as a DataFrame like the CSV logs. The range is
+    start_ns..end_ns (epoch ns) or the last last_seconds of the firing; only
+    the segments the manifest says overlap it are opened.
+    """
+    manifest = read_manifest(root, session_id)
+    time_column = manifest['time_column']
+    segments = manifest['segments']
+    if last_seconds is not None and segments:
+        end_ns = segments[-1]['last_ns']
+        start_ns = end_ns - int(last_seconds * 1e9)
+
+    frames = []
+    for segment in segments:
+        if segment['rows'] == 0:
+            continue
+        if start_ns is not None and segment['last_ns'] < start_ns:
+            continue
+        if end_ns is not None and segment['first_ns'] > end_ns:
+            continue
+        frame = load_log(os.path.join(root, session_id, segment['file']), columns=columns, cache=False)
+        times = frame[time_column].to_numpy()
+        keep = np.ones(len(frame), dtype=bool)
+        if start_ns is not None:
+            keep &= times >= start_ns
+        if end_ns is not None:
+            keep &= times <= end_ns
+        frames.append(frame[keep])
+
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        names = manifest['columns'] if columns is None else [time_column, *[c for c in columns if c != time_column]]
+        df = pd.DataFrame({name: np.array([], dtype=np.int64 if name == time_column else np.float64) for name in names})
+    df[time_column] = pd.to_datetime(df[time_column], unit='ns', utc=True).dt.tz_convert(tz or manifest['timezone'])
+    return df
+
+
+def verify_session(root, session_id):
+    """
+    Checks every segment against the checksum in the manifest. Returns the names of segments that do not match.
+    """
+    bad = []
+    for segment in read_manifest(root, session_id)['segments']:
+        digest = hashlib.sha256()
+        with open(os.path.join(root, session_id, segment['file']), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        if digest.hexdigest() != segment['sha256']:
+            bad.append(segment['file'])
+    return bad
+
+
+def prune_sessions(root='firings', keep=()):
+    """
+    Deletes sessions that never recorded a sample (aborted starts), apart from
+    the ids in keep. Returns the ids removed.
+    """
+    removed = []
+    for session_id in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        directory = os.path.join(root, session_id)
+        if session_id in keep or not os.path.isdir(directory):
+            continue
+        try:
+            rows = read_manifest(root, session_id)['rows']
+        except FileNotFoundError:
+            rows = 0 if not os.listdir(directory) else None
+        except ValueError:
+            rows = None  # Unreadable manifest: leave it for a person to look at
+        if rows == 0:
+            shutil.rmtree(directory)
+            removed.append(session_id)
+    if removed:
+        logging.info(f"Pruned {len(removed)} empty firing sessions: {', '.join(removed)}")
+    return removed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="List, check and prune firing sessions.")
+    parser.add_argument('--root', default='firings')
+    parser.add_argument('--verify', action='store_true', help="check every segment checksum")
+    parser.add_argument('--prune', action='store_true', help="delete sessions without samples")
+    args = parser.parse_args()
+    if args.prune:
+        prune_sessions(args.root)
+    sessions = list_sessions(args.root)
+    print(sessions.to_string(index=False) if len(sessions) else "No sessions")
+    if args.verify:
+        for session_id in sessions.get('session_id', []):
+            bad = verify_session(args.root, session_id)
+            print(f"{session_id}: {'OK' if not bad else 'checksum mismatch in ' + ', '.join(bad)}")
@@ -0,0 +1,266 @@
+import numpy as np
+
+
+class StreamingMean:
+    """
+    Trailing moving average over the last `window` samples, for any number of
+    channels at once. Each update is O(1): the newest value is added to a
+    running sum and the value leaving the window is subtracted.
+    Uses the same compensated sums as pandas rolling(window).mean(), so the
+    results match it, including NaN until the window holds enough readings.
+    Create one instance per window length.
+    """
+
+    def __init__(self, window, channels=1, min_periods=None):
+        self.window = window
+        self.channels = channels
+        self.min_periods = window if min_periods is None else min_periods
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all history.
+        """
+        shape = (self.channels,)
+        self._buffer = np.full((self.window, self.channels), np.nan)
+        self._pos = 0
+        self._count = 0
+        self._nobs = np.zeros(shape, dtype=np.int64)
+        self._neg_ct = np.zeros(shape, dtype=np.int64)
+        self._sum = np.zeros(shape)
+        self._comp_add = np.zeros(shape)
+        self._comp_remove = np.zeros(shape)
+        self._same_ct = np.zeros(shape, dtype=np.int64)
+        self._prev = np.full(shape, np.nan)
+        self.mean = np.full(shape, np.nan)
+
+    def _remove(self, values):
+        valid = ~np.isnan(values)
+        y = -values - self._comp_remove
+        t = self._sum + y
+        self._comp_remove = np.where(valid, t - self._sum - y, self._comp_remove)
+        self._sum = np.where(valid, t, self._sum)
+        self._nobs -= valid
+        self._neg_ct -= valid & np.signbit(values)
+
+    def _add(self, values):
+        valid = ~np.isnan(values)
+        y = values - self._comp_add
+        t = self._sum + y
+        self._comp_add = np.where(valid, t - self._sum - y, self._comp_add)
+        self._sum = np.where(valid, t, self._sum)
+        self._nobs += valid
+        self._neg_ct += valid & np.signbit(values)
+        repeated = valid & (values == self._prev)
+        self._same_ct = np.where(valid, np.where(repeated, self._same_ct + 1, 1), self._same_ct)
+        self._prev = np.where(valid, values, self._prev)
+
+    def update(self, values):
+        """
+        Pushes the newest value for every channel and returns the current means.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(self.channels)
+        if self._count >= self.window:
+            self._remove(self._buffer[self._pos])
+        else:
+            self._count += 1
+        self._add(values)
+        self._buffer[self._pos] = values
+        self._pos = (self._pos + 1) % self.window
+
+        nobs = self._nobs
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self._sum / nobs
+        # Same clean-ups pandas applies: exact value for a run of repeats, no sign flips from rounding
+        mean = np.where(self._same_ct >= nobs, self._prev, mean)
+        mean = np.where((self._neg_ct == 0) & (mean < 0), 0.0, mean)
+        mean = np.where((self._neg_ct == nobs) & (mean > 0), 0.0, mean)
+        self.mean = np.where((nobs >= self.min_periods) & (nobs > 0), mean, np.nan)
+        return self.mean
+
+
+class MultiHorizonRates:
+    """
+    Least-squares rate of every channel over several trailing horizons at once
+    (e.g. 60, 600 and 3600 seconds). Prefix sums of the count, t, y, t*t and
+    t*y are kept for every sample, so the sums over any trailing window are
+    the difference of two prefix rows. Each horizon keeps a pointer to its
+    oldest sample that only moves forward, which makes an update O(horizons)
+    however long the windows are. Rows older than the longest horizon are
+    dropped every `refresh` samples, and the time origin moves up with them.
+    Returns an array of shape (horizons, channels), per second times `scale`.
+    """
+
+    _SUMS = 5  # count, t, y, t*t, t*y
+
+    def __init__(self, horizons, channels=1, scale=3600, min_points=2, capacity=4096, refresh=256):
+        self.horizons = list(horizons)
+        self.channels = channels
+        self.scale = scale
+        self.min_points = min_points
+        self.capacity = capacity
+        self.refresh = refresh
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all history.
+        """
+        self._prefix = np.zeros((self.capacity + 1, self._SUMS, self.channels))
+        self._times = np.zeros(self.capacity)
+        self._rows = 0
+        self._origin = None
+        self._starts = [0] * len(self.horizons)
+        self._since_compact = 0
+        self.rates = np.full((len(self.horizons), self.channels), np.nan)
+
+    def _compact(self):
+        """
+        Drops rows no horizon needs any more and moves the time origin to the
+        oldest row kept, so the sums stay small and precise.
+        """
+        oldest = min(self._starts)
+        kept = self._rows - oldest
+        # Prefix differences do not change if every row loses the same amount
+        prefix = self._prefix[oldest:self._rows + 1] - self._prefix[oldest]
+        shift = self._times[oldest]
+        n, st, sy, stt, sty = prefix.transpose(1, 0, 2)
+        self._prefix[:kept + 1] = np.stack([n, st - n * shift, sy, stt - 2 * shift * st + n * shift * shift,
+                                            sty - shift * sy], axis=1)
+        self._times[:kept] = self._times[oldest:self._rows] - shift
+        self._origin += shift
+        self._rows = kept
+        self._starts = [start - oldest for start in self._starts]
+        self._since_compact = 0
+
+    def update(self, t, values):
+        """
+        Adds the reading of every channel at time t (seconds) and returns the
+        rates over each horizon (NaN until a horizon holds min_points readings).
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(self.channels)
+        if self._origin is None:
+            self._origin = t
+        if self._rows == len(self._times) or self._since_compact >= self.refresh:
+            self._compact()
+            if self._rows == len(self._times):  # Still full: the longest horizon needs more rows
+                self._prefix = np.concatenate([self._prefix, np.zeros_like(self._prefix[1:])])
+                self._times = np.concatenate([self._times, np.zeros_like(self._times)])
+        self._since_compact += 1
+
+        t_relative = t - self._origin
+        valid = ~np.isnan(values)
+        y = np.where(valid, values, 0.0)
+        row = self._rows
+        self._prefix[row + 1] = self._prefix[row] + np.stack(
+            [valid, t_relative * valid, y, t_relative * t_relative * valid, t_relative * y])
+        self._times[row] = t_relative
+        self._rows += 1
+
+        for i, horizon in enumerate(self.horizons):
+            start = self._starts[i]
+            while self._times[start] < t_relative - horizon:
+                start += 1
+            self._starts[i] = start
+        starts = np.array(self._starts)
+        n, st, sy, stt, sty = (self._prefix[self._rows][:, None] - self._prefix[starts].transpose(1, 0, 2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            denominator = n * stt - st * st
+            slope = (n * sty - st * sy) / denominator
+        self.rates = np.where((n >= self.min_points) & (denominator > 0), slope * self.scale, np.nan)
+        return self.rates
+
+
+class StreamingSlope(MultiHorizonRates):
+    """
+    Least-squares slope of each channel over the trailing `window` seconds,
+    using the actual sample times, so skipped or late readings do not distort
+    the rate: a MultiHorizonRates with a single horizon. update() returns one
+    slope per channel, per second times `scale` (3600 gives °F/h from °F).
+    """
+
+    def __init__(self, window, channels=1, scale=3600, min_points=2, capacity=4096, refresh=256):
+        self.window = window
+        super().__init__((window,), channels, scale, min_points, capacity, refresh)
+
+    @property
+    def slope(self):
+        return self.rates[0]
+
+    def update(self, t, values):
+        """
+        Adds the reading of every channel at time t (seconds, e.g. monotonic)
+        and returns the current slopes (NaN while fewer than min_points readings).
+        """
+        return super().update(t, values)[0]
+
+
+class KalmanRate:
+    """
+    Constant-velocity Kalman filter for every channel at once. The state is
+    (temperature, rate in units per hour); each update predicts forward by the
+    real time since the last reading, then corrects with the new reading, at
+    a fixed cost per sample.
+    measurement_noise is the standard deviation of a reading (quantization
+    plus electrical noise). process_noise is how fast the rate itself may
+    wander, as a rate variance per hour ((°F/h)^2 per h); raise it for a
+    quicker response to ramp changes, lower it for a smoother rate.
+    A NaN reading only advances the prediction for that channel.
+    """
+
+    def __init__(self, channels=1, measurement_noise=0.25, process_noise=1e4, initial_rate_std=1000.0):
+        self.channels = channels
+        self.measurement_noise = measurement_noise
+        self.process_noise = process_noise
+        self.initial_rate_std = initial_rate_std
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all history.
+        """
+        self.state = np.full((self.channels, 2), np.nan)
+        self.covariance = np.zeros((self.channels, 2, 2))
+        self._last_time = None
+
+    @property
+    def temperature(self):
+        return self.state[:, 0]
+
+    @property
+    def rate(self):
+        return self.state[:, 1]
+
+    @property
+    def rate_std(self):
+        return np.sqrt(self.covariance[:, 1, 1])
+
+    def update(self, t, values):
+        """
+        Adds the reading of every channel at time t (seconds) and returns the
+        filtered (temperatures, rates per hour).
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(self.channels)
+        dt = 0.0 if self._last_time is None else (t - self._last_time) / 3600
+        self._last_time = t
+
+        # Channels seen for the first time start at the reading with an unknown rate
+        new = np.isnan(self.state[:, 0]) & ~np.isnan(values)
+        self.state[new] = np.stack([values[new], np.zeros(new.sum())], axis=1)
+        self.covariance[new] = np.diag([self.measurement_noise ** 2, self.initial_rate_std ** 2])
+        known = ~np.isnan(self.state[:, 0]) & ~new
+
+        # Predict: x = F x, P = F P F' + Q
+        F = np.array([[1.0, dt], [0.0, 1.0]])
+        Q = self.process_noise * np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+        self.state[known] = self.state[known] @ F.T
+        self.covariance[known] = F @ self.covariance[known] @ F.T + Q
+
+        # Correct with the reading (only the temperature is measured)
+        measured = known & ~np.isnan(values)
+        P = self.covariance[measured]
+        innovation = values[measured] - self.state[measured, 0]
+        gain = P[:, :, 0] / (P[:, 0, 0] + self.measurement_noise ** 2)[:, None]
+        self.state[measured] += gain * innovation[:, None]
+        self.covariance[measured] = P - gain[:, :, None] * P[:, None, 0, :]
+        return self.temperature.copy(), self.rate.copy()
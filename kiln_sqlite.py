@@ -0,0 +1,125 @@
+import json
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteSampleStore:
+    """
+    Stores samples in a local SQLite database in WAL mode, so the live plot,
+    post-firing analysis and outside readers can all query it while the logger
+    is still writing. Samples are keyed by (firing_id, time_ns), which is also
+    the table's clustered index, so a time-range query for one firing reads
+    only that range.
+    Like the CSV writer, flush() keeps a high-water mark and inserts only new
+    rows, all in one transaction.
+    synchronous='FULL' makes every committed flush survive a power cut, which
+    the sample journal relies on before it drops rows; 'NORMAL' may lose the
+    last commit but never corrupts the database.
+    """
+
+    def __init__(self, db_path, columns, firing_id, time_column='Time', synchronous='NORMAL'):
+        self.db_path = db_path
+        self.columns = list(columns)
+        self.time_column = time_column
+        self.data_columns = [name for name in self.columns if name != time_column]
+        self.firing_id = firing_id
+        self.rows_written = 0
+
+        # The storage thread does the writing, so the connection must not be tied to the creating thread
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(f'PRAGMA synchronous={synchronous}')
+        self._create_tables()
+        placeholders = ', '.join('?' * (len(self.data_columns) + 2))
+        self._insert = (f'INSERT OR REPLACE INTO samples (firing_id, time_ns, '
+                        f'{", ".join(_quote(name) for name in self.data_columns)}) VALUES ({placeholders})')
+
+    def _create_tables(self):
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS firings '
+                                    '(firing_id TEXT PRIMARY KEY, started_ns INTEGER, columns TEXT)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS samples '
+                                    '(firing_id TEXT NOT NULL, time_ns INTEGER NOT NULL, '
+                                    'PRIMARY KEY (firing_id, time_ns)) WITHOUT ROWID')
+            existing = {row[1] for row in self.connection.execute('PRAGMA table_info(samples)')}
+            for name in self.data_columns:
+                if name not in existing:
+                    # Firings with more probes just add columns; older firings read them as NULL
+                    self.connection.execute(f'ALTER TABLE samples ADD COLUMN {_quote(name)} REAL')
+            self.connection.execute('INSERT OR IGNORE INTO firings VALUES (?, NULL, ?)',
+                                    (self.firing_id, json.dumps(self.columns, ensure_ascii=False)))
+
+    def flush(self, store):
+        """
+        Inserts the rows of a SampleStore that are not in the database yet. Returns the number written.
+        """
+        start = self.rows_written
+        stop = store.total_rows
+        if stop <= start:
+            return 0
+
+        self.insert(store.rows(start, stop))
+        self.rows_written = stop
+        return stop - start
+
+    def insert(self, columns):
+        """
+        Inserts (or replaces) samples given as {name: array}, in one transaction.
+        """
+        times = np.asarray(columns[self.time_column]).tolist()
+        if not times:
+            return
+        values = zip(*(np.asarray(columns[name]).tolist() for name in self.data_columns))
+        rows = [(self.firing_id, time_ns, *row) for time_ns, row in zip(times, values)]
+        with self.connection:  # One transaction per flush
+            self.connection.executemany(self._insert, rows)
+            self.connection.execute('UPDATE firings SET started_ns = ? WHERE firing_id = ? '
+                                    'AND (started_ns IS NULL OR started_ns > ?)', (times[0], self.firing_id, times[0]))
+
+    def close(self):
+        self.connection.close()
+
+
+def list_firings(db_path):
+    """
+    Returns a DataFrame of the firings in a database with their sample counts and time span.
+    """
+    with closing(sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)) as connection:
+        return pd.read_sql_query('SELECT f.firing_id, COUNT(s.time_ns) AS samples, '
+                                 'MIN(s.time_ns) AS first_ns, MAX(s.time_ns) AS last_ns '
+                                 'FROM firings f LEFT JOIN samples s USING (firing_id) '
+                                 'GROUP BY f.firing_id ORDER BY f.started_ns', connection)
+
+
+def query_samples(db_path, firing_id, start_ns=None, end_ns=None, columns=None, tz='America/New_York',
+                  time_column='Time'):
+    """
+    Reads one firing (optionally a time range and some columns) from a database,
+    read-only, so it can run while the logger is writing. Returns a DataFrame
+    like the CSV logs.
+    """
+    with closing(sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)) as connection:
+        if columns is None:
+            (stored,) = connection.execute('SELECT columns FROM firings WHERE firing_id = ?', (firing_id,)).fetchone()
+            columns = [name for name in json.loads(stored) if name != time_column]
+        sql = f'SELECT time_ns, {", ".join(_quote(name) for name in columns)} FROM samples WHERE firing_id = ?'
+        params = [firing_id]
+        if start_ns is not None:
+            sql += ' AND time_ns >= ?'
+            params.append(int(start_ns))
+        if end_ns is not None:
+            sql += ' AND time_ns <= ?'
+            params.append(int(end_ns))
+        sql += ' ORDER BY time_ns'
+        rows = connection.execute(sql, params).fetchall()
+
+    df = pd.DataFrame.from_records(rows, columns=['time_ns', *columns]).astype({name: np.float64 for name in columns})
+    df.insert(0, time_column, pd.to_datetime(df.pop('time_ns').astype(np.int64), unit='ns', utc=True).dt.tz_convert(tz))
+    return df
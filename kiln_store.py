@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+
+class SampleStore:
+    """
+    Columnar, NumPy-backed store for logged samples.
+    Appends are amortized O(1) (capacity doubles when full) and column() hands
+    out zero-copy views, so the plotting and CSV code never copy the history.
+    With max_rows set, only the newest max_rows samples are kept.
+    The 'Time' column holds UTC epoch nanoseconds as int64, everything else float64.
+    """
+
+    def __init__(self, columns, time_column='Time', chunk_size=4096, max_rows=None):
+        self.columns = list(columns)
+        self.time_column = time_column
+        self.max_rows = max_rows
+        self.dtypes = {name: np.int64 if name == time_column else np.float64 for name in self.columns}
+        capacity = chunk_size if max_rows is None else 2 * max_rows
+        self._data = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.dtypes.items()}
+        self._capacity = capacity
+        self._start = 0    # Buffer position of the oldest retained sample
+        self._stop = 0     # Buffer position one past the newest sample
+        self.dropped = 0   # Samples discarded from the front in bounded mode
+
+    @classmethod
+    def from_columns(cls, data, columns, time_column='Time', first_row=0):
+        """
+        Builds a store holding copies of the arrays in data ({name: array}),
+        numbered from first_row as if the rows before it had been dropped.
+        """
+        count = len(data[time_column])
+        store = cls(columns, time_column, chunk_size=max(count, 1))
+        for name in store.columns:
+            store._data[name][:count] = data[name]
+        store._stop = count
+        store.dropped = first_row
+        return store
+
+    def __len__(self):
+        return self._stop - self._start
+
+    @property
+    def total_rows(self):
+        """
+        Number of samples ever appended, including any dropped in bounded mode.
+        """
+        return self.dropped + len(self)
+
+    def _make_room(self):
+        if self.max_rows is not None:
+            # Slide the newest max_rows samples to the front; happens once every max_rows appends
+            keep = min(len(self), self.max_rows - 1)
+            first = self._stop - keep
+            for column in self._data.values():
+                column[:keep] = column[first:self._stop]
+            self.dropped += first - self._start
+            self._start, self._stop = 0, keep
+            return
+
+        self._capacity *= 2
+        for name, column in self._data.items():
+            grown = np.empty(self._capacity, dtype=column.dtype)
+            grown[:self._stop] = column[:self._stop]
+            self._data[name] = grown
+
+    def append(self, row):
+        """
+        Appends one sample given as a sequence in column order.
+        """
+        if self._stop == self._capacity:
+            self._make_room()
+        i = self._stop
+        for column, value in zip(self._data.values(), row):
+            column[i] = value
+        self._stop += 1
+        if self.max_rows is not None and len(self) > self.max_rows:
+            self._start += 1
+            self.dropped += 1
+
+    def column(self, name, start=None, stop=None):
+        """
+        Returns a writable view of one column over the retained samples.
+        start/stop index the retained samples like a normal slice.
+        """
+        return self._data[name][self._start:self._stop][start:stop]
+
+    def tail(self, name, n):
+        """
+        Returns a view of the last n samples of a column.
+        """
+        return self.column(name, max(len(self) - n, 0))
+
+    def last(self, name):
+        """
+        Returns the newest value of a column, or None if the store is empty.
+        """
+        if len(self) == 0:
+            return None
+        return self._data[name][self._stop - 1]
+
+    def rows(self, start=None, stop=None):
+        """
+        Returns {column: view} for samples start..stop, where the indices count
+        every sample ever appended (same numbering as total_rows).
+        """
+        start = self.dropped if start is None else max(start, self.dropped)
+        stop = self.total_rows if stop is None else min(stop, self.total_rows)
+        first, last = start - self.dropped, max(stop - self.dropped, start - self.dropped)
+        return {name: self.column(name, first, last) for name in self.columns}
+
+    def snapshot(self, start=None):
+        """
+        Returns a copy of samples start..total_rows as a new SampleStore with the
+        same row numbering, so writers can flush from it after the lock that
+        guards this store has been released.
+        """
+        rows = self.rows(start)
+        return SampleStore.from_columns(rows, self.columns, self.time_column,
+                                        first_row=self.total_rows - len(rows[self.time_column]))
+
+    def to_dataframe(self, start=None, stop=None, tz='America/New_York'):
+        """
+        Builds a DataFrame for export from samples start..stop, numbered as in rows().
+        """
+        data = {}
+        for name, values in self.rows(start, stop).items():
+            if name == self.time_column:
+                values = pd.to_datetime(values, unit='ns', utc=True).tz_convert(tz)
+            data[name] = values
+        return pd.DataFrame(data, columns=self.columns)
@@ -0,0 +1,76 @@
+import numpy as np
+
+from kiln_archive import ArchiveWriter, iter_blocks, read_archive
+from kiln_binlog import to_epoch_ns
+
+COLUMNS = ['Time', 'Temperature Sensor 1 (°F)', 'Rate of Change Sensor 1 (°F/h)']
+
+
+def _firing(rows, start_ns=1_730_737_219_436_045_000):
+    """
+    Columns like the logger's: jittery 10 s times, a noisy ramp, a rate with NaN gaps and repeats.
+    """
+    rng = np.random.default_rng(rows)
+    times = start_ns + np.cumsum(rng.integers(9_990_000_000, 10_010_000_000, rows)) // 1000 * 1000
+    temperatures = 70 + np.arange(rows) * 0.83 + rng.normal(0, 0.4, rows)
+    rates = rng.normal(300, 25, rows)
+    rates[::7] = np.nan
+    rates[3::11] = rates[2::11][:len(rates[3::11])]  # Repeated values XOR to zero
+    if rows > 21:
+        rates[20], rates[21] = 300.0, np.nextafter(300.0, np.inf)  # One ulp apart: a 1-bit XOR
+    temperatures[5::13] = np.nan
+    return {'Time': times, COLUMNS[1]: temperatures, COLUMNS[2]: rates}
+
+
+def _assert_bits_equal(actual, expected):
+    # Compare the raw bits, so NaN payloads and -0.0 count too
+    assert np.array_equal(np.asarray(actual).view(np.uint64), np.asarray(expected, dtype=np.float64).view(np.uint64))
+
+
+def test_round_trip_is_bit_for_bit(tmp_path):
+    filename = str(tmp_path / 'firings.kga')
+    data = _firing(1000)
+    data[COLUMNS[1]][0] = -0.0
+    ArchiveWriter(filename, COLUMNS, block_rows=256).append(data)
+
+    df = read_archive(filename, tz='UTC')
+    assert np.array_equal(to_epoch_ns(df['Time']), data['Time'])
+    for name in COLUMNS[1:]:
+        _assert_bits_equal(df[name].to_numpy(), data[name])
+
+
+def test_one_and_two_row_blocks(tmp_path):
+    filename = str(tmp_path / 'firings.kga')
+    data = _firing(5)
+    ArchiveWriter(filename, COLUMNS, block_rows=2).append(data)  # Blocks of 2, 2 and 1 rows
+    single = _firing(1, start_ns=int(data['Time'][-1]) + 10**10)
+    single[COLUMNS[2]][0] = np.nan
+    ArchiveWriter(filename, COLUMNS).append(single)  # Appending to an existing archive
+
+    blocks = list(iter_blocks(filename))
+    assert [len(block['Time']) for block in blocks] == [2, 2, 1, 1]
+    for name in COLUMNS:
+        expected = np.concatenate([data[name], single[name]])
+        actual = np.concatenate([block[name] for block in blocks])
+        if name == 'Time':
+            assert np.array_equal(actual, expected)
+        else:
+            _assert_bits_equal(actual, expected)
+
+
+def test_range_reads_match_slices(tmp_path):
+    filename = str(tmp_path / 'firings.kga')
+    data = _firing(1000)
+    ArchiveWriter(filename, COLUMNS, block_rows=100).append(data)
+    times = data['Time']
+
+    for first, last in [(0, 999), (150, 160), (199, 200), (100, 199), (0, 0), (999, 999), (250, 720)]:
+        blocks = list(iter_blocks(filename, columns=[COLUMNS[2]], start_ns=times[first], end_ns=times[last]))
+        assert all(set(block) == {'Time', COLUMNS[2]} for block in blocks)
+        assert np.array_equal(np.concatenate([block['Time'] for block in blocks]), times[first:last + 1])
+        _assert_bits_equal(np.concatenate([block[COLUMNS[2]] for block in blocks]), data[COLUMNS[2]][first:last + 1])
+
+    # Between two samples, and outside the archive altogether
+    df = read_archive(filename, start_ns=times[10] + 1, end_ns=times[12] - 1, tz='UTC')
+    assert len(df) == 1
+    assert len(read_archive(filename, start_ns=times[-1] + 1, tz='UTC')) == 0
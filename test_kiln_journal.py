@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+
+from kiln_binlog import to_epoch_ns
+from kiln_csv import IncrementalCSVWriter
+from kiln_journal import SampleJournal, read_journal, recover_journals
+from kiln_loader import load_log
+from kiln_sessions import FiringSession, read_manifest, read_session, verify_session
+from kiln_store import SampleStore
+
+COLUMNS = ['Time', 'Temperature Sensor 1 (°F)', 'Rate of Change Sensor 1 (°F/h)']
+
+
+def _log_firing(store, journal, writer, rows, flush_every):
+    """
+    Appends and journals rows like the logger, flushing the main log and compacting the journal as it goes.
+    """
+    rng = np.random.default_rng(0)
+    for i in range(rows):
+        row = [1_730_737_219_436_045_000 + i * 10_000_123_000, 70 + i * 0.83 + rng.normal(), rng.normal(300, 25)]
+        if i % 17 == 0:
+            row[2] = np.nan
+        store.append(row)
+        journal.append(store.total_rows - 1, row)
+        if i % flush_every == flush_every - 1:
+            writer.flush(store)
+            journal.compact(writer.rows_written)
+
+
+def _tear(path, data=None, cut=0):
+    """
+    Leaves a file as a power cut would: a partly written line appended, or the last cut bytes lost.
+    """
+    if data is not None:
+        with open(path, 'ab') as f:
+            f.write(data)
+    if cut:
+        os.truncate(path, os.path.getsize(path) - cut)
+
+
+def _assert_matches_store(df, store, rows):
+    expected = store.rows(0, rows)
+    assert np.array_equal(df['Time'].to_numpy(), expected['Time'])
+    for name in COLUMNS[1:]:
+        assert np.array_equal(df[name].to_numpy(), expected[name], equal_nan=True)
+
+
+def test_recover_csv_after_compaction_and_torn_writes(tmp_path):
+    target = str(tmp_path / 'thermocouple_data_F1.csv')
+    path = str(tmp_path / 'thermocouple_data_F1.journal')
+    store = SampleStore(COLUMNS)
+    writer = IncrementalCSVWriter(target, COLUMNS, fsync=True, tz='UTC')
+    journal = SampleJournal(path, COLUMNS, target, fsync_every=1)
+    _log_firing(store, journal, writer, 250, flush_every=100)
+    journal.close()
+
+    assert (journal.first_row, journal.records) == (200, 50)  # Only the rows the CSV does not have
+    records, _ = read_journal(path)
+    assert records['row'].tolist() == list(range(200, 250))
+
+    _tear(target, data='2024-11-04 12:00:00.123+00:00,981.2'.encode('utf-8'))
+    _tear(path, cut=5)
+    assert recover_journals(str(tmp_path / '*.journal'), tz='UTC') == 49
+    assert not os.path.exists(path)
+    _assert_matches_store(load_log(target, cache=False), store, 249)  # The torn last record is lost
+
+
+def test_recover_session_after_compaction_and_torn_writes(tmp_path):
+    root = str(tmp_path / 'firings')
+    target = str(tmp_path / 'thermocouple_data_F2.csv')
+    path = str(tmp_path / 'thermocouple_data_F2.journal')
+    store = SampleStore(COLUMNS)
+    session = FiringSession(root, 'F2', COLUMNS, peak_columns=[COLUMNS[1]], segment_rows=60, tz='UTC', fsync=True)
+    journal = SampleJournal(path, COLUMNS, target, fsync_every=1, firing_id='F2', session=root)
+    _log_firing(store, journal, session, 270, flush_every=50)
+    journal.close()
+    assert (journal.first_row, journal.records) == (250, 20)
+
+    last_segment = os.path.join(root, 'F2', session.segments[-1]['file'])
+    _tear(last_segment, data=b'2024-11-04 12:00:00.123+00:00,981.2')
+    _tear(path, cut=5)
+    assert recover_journals(str(tmp_path / '*.journal'), tz='UTC') == 19
+    assert not os.path.exists(path)
+
+    manifest = read_manifest(root, 'F2')
+    assert manifest['closed'] and manifest['rows'] == 269
+    assert [segment['rows'] for segment in manifest['segments']] == [60, 60, 60, 60, 29]
+    assert verify_session(root, 'F2') == []
+    assert manifest['segments'][-1]['peaks'][COLUMNS[1]] == np.nanmax(store.rows(240, 269)[COLUMNS[1]])
+    session_df = read_session(root, 'F2', tz='UTC')
+    session_df['Time'] = to_epoch_ns(session_df['Time'])
+    _assert_matches_store(session_df, store, 269)
+    _assert_matches_store(load_log(target, cache=False), store, 269)  # The flat CSV export
@@ -0,0 +1,55 @@
+from kiln_scheduler import SampleScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fire_due(scheduler, clock):
+    """
+    Calls wait() for as long as the next deadline is already due. Returns the lateness of each tick fired.
+    """
+    lateness = []
+    while scheduler.deadline() + scheduler.interval <= clock.now + 1e-9:
+        scheduler.wait()
+        lateness.append(clock.now - scheduler.deadline())
+    return lateness
+
+
+def test_catch_up_fires_at_most_max_catch_up_missed_ticks():
+    clock = FakeClock()
+    scheduler = SampleScheduler(1.0, policy='catch_up', max_catch_up=3, clock=clock)
+    scheduler.wait()
+
+    clock.now = 5.5  # Stall: the deadlines at 1, 2, 3, 4 and 5 are all due
+    lateness = _fire_due(scheduler, clock)
+
+    missed_fired = [late for late in lateness if late >= scheduler.interval]
+    assert len(missed_fired) == 3
+    assert scheduler.skipped == 5 - 1 - 3  # Five due, the latest fires anyway, three caught up
+    assert lateness == [3.5, 2.5, 1.5, 0.5]
+    assert scheduler.deadline() + scheduler.interval > clock.now  # Next tick waits again
+
+
+def test_catch_up_fires_every_missed_tick_within_the_limit():
+    clock = FakeClock()
+    scheduler = SampleScheduler(1.0, policy='catch_up', max_catch_up=3, clock=clock)
+    scheduler.wait()
+
+    clock.now = 3.25  # Deadlines 1, 2 and 3 are due
+    assert _fire_due(scheduler, clock) == [2.25, 1.25, 0.25]
+    assert scheduler.skipped == 0
+
+
+def test_skip_fires_only_the_latest_deadline():
+    clock = FakeClock()
+    scheduler = SampleScheduler(1.0, policy='skip', clock=clock)
+    scheduler.wait()
+
+    clock.now = 5.5
+    assert _fire_due(scheduler, clock) == [0.5]
+    assert scheduler.skipped == 4